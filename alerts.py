@@ -0,0 +1,186 @@
+# Smart Alerts: data validation checks scored once per dataset version
+#
+# Baselines are computed per group with vectorized groupby/NumPy operations
+# over the whole combined frame, and every row is scored against them in the
+# same pass. The flagged rows are kept as an index of row positions into the
+# dataset, so Page 6 only looks rows up instead of re-running checks on render.
+#
+# Checks:
+#   unit_value         value per quantity far from the median of its
+#                      Trade_Type x HS_Code x Unit x Flow group (robust z-score
+#                      on the log scale, using the median absolute deviation)
+#   partner_shift      a partner's share of an HS code's trade in one quarter
+#                      far above its share in the other quarters
+#   office_shift       the same for customs offices
+#   quantity_mismatch  a value without a quantity, or a quantity without a value
+import numpy as np
+import pandas as pd
+
+# Group of transactions that share a unit-value baseline
+BASELINE_KEYS = ['Trade_Type', 'HS_Code', 'Unit', 'Flow']
+
+# Group whose partner / customs office mix is compared across quarters
+PRODUCT_KEYS = ['Trade_Type', 'Flow', 'HS_Code']
+PERIOD_KEYS = ['Year', 'Quarter']
+
+ALERTS = {
+    'unit_value': "Unit value far from the usual price of this product",
+    'partner_shift': "Sudden shift in the partner country mix",
+    'office_shift': "Sudden shift in the customs office mix",
+    'quantity_mismatch': "Quantity and value do not match",
+}
+
+# Robust z-score (0.6745 * deviation / MAD) above which a unit value is flagged
+UNIT_VALUE_Z = 3.5
+
+# Smallest group with a usable baseline
+MIN_GROUP_ROWS = 20
+
+# Rise in share (0-1) of one partner or office, versus the other quarters, that is flagged
+SHIFT_THRESHOLD = 0.3
+
+# Quarters an HS code must have for its mix to be compared
+MIN_PERIODS = 3
+
+
+def _group_codes(df, keys):
+    """Group number of every row (-1 where a key is missing)"""
+    return df.groupby(keys, observed=True, sort=True, dropna=True).ngroup().to_numpy()
+
+
+def unit_value_baselines(df):
+    """Per-row robust z-score of the log unit value, the group's median unit value, and the baselines"""
+    value = df['Trade_Value_USD'].to_numpy(dtype='float64')
+    quantity = df['Quantity'].to_numpy(dtype='float64')
+    priced = (value > 0) & (quantity > 0)
+
+    groups = _group_codes(df, BASELINE_KEYS)
+    priced &= groups >= 0
+
+    log_unit_value = np.full(len(df), np.nan)
+    log_unit_value[priced] = np.log10(value[priced] / quantity[priced])
+
+    grouped = pd.Series(log_unit_value).groupby(groups)
+    median = grouped.median()
+    mad = (pd.Series(log_unit_value) - median.reindex(groups).to_numpy()).abs().groupby(groups).median()
+    count = grouped.count()
+
+    baselines = (
+        df.groupby(BASELINE_KEYS, observed=True, sort=True)
+        .size()
+        .rename('Rows')
+        .reset_index()
+    )
+    baselines['Transactions_Priced'] = count.reindex(baselines.index).fillna(0).astype('int64').to_numpy()
+    baselines['Median_Unit_Value'] = 10 ** median.reindex(baselines.index).to_numpy()
+    baselines['MAD_Log10'] = mad.reindex(baselines.index).to_numpy()
+
+    row_median = median.reindex(groups).to_numpy()
+    row_mad = mad.reindex(groups).to_numpy()
+    usable = (count.reindex(groups).to_numpy() >= MIN_GROUP_ROWS) & (row_mad > 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        z = np.where(usable, 0.6745 * (log_unit_value - row_median) / row_mad, np.nan)
+    return z, 10 ** row_median, baselines
+
+
+def share_shift(df, dim):
+    """Per-row rise of dim's share of its HS code's value in that quarter, versus the other quarters"""
+    value = df['Trade_Value_USD'].astype('float64')
+
+    def total(keys):
+        return value.groupby([df[key] for key in keys], observed=True, sort=False).transform('sum').to_numpy()
+
+    cell = total(PRODUCT_KEYS + [dim] + PERIOD_KEYS)
+    product_period = total(PRODUCT_KEYS + PERIOD_KEYS)
+    dim_all = total(PRODUCT_KEYS + [dim])
+    product_all = total(PRODUCT_KEYS)
+
+    period = _group_codes(df, PERIOD_KEYS)
+    periods = (
+        pd.Series(period).groupby([df[key] for key in PRODUCT_KEYS], observed=True, sort=False)
+        .transform('nunique').to_numpy()
+    )
+
+    # Share in the other quarters leaves the row's own quarter out
+    other = product_all - product_period
+    with np.errstate(divide='ignore', invalid='ignore'):
+        share = cell / product_period
+        usual_share = (dim_all - cell) / other
+    usable = (periods >= MIN_PERIODS) & (other > 0) & (product_period > 0)
+    return np.where(usable, share - usual_share, np.nan), np.where(usable, usual_share, np.nan)
+
+
+def quantity_mismatch(df):
+    """Rows with a positive value but no quantity, or a positive quantity but no value"""
+    value = df['Trade_Value_USD'].to_numpy(dtype='float64')
+    quantity = df['Quantity'].to_numpy(dtype='float64')
+    no_quantity = (value > 0) & ~(quantity > 0)
+    no_value = (quantity > 0) & ~(value > 0)
+    return no_quantity | no_value
+
+
+class AlertIndex:
+    """Flagged rows of one dataset version, with the baselines they were scored against"""
+
+    def __init__(self, df):
+        self.df = df
+        flags = []
+
+        def flag(kind, mask, score, expected):
+            rows = np.flatnonzero(mask)
+            flags.append(pd.DataFrame({
+                'Row': rows,
+                'Alert': kind,
+                'Score': score[rows],
+                'Expected': expected[rows],
+            }))
+
+        z, median_unit_value, self.baselines = unit_value_baselines(df)
+        flag('unit_value', np.abs(z) > UNIT_VALUE_Z, z, median_unit_value)
+
+        for kind, dim in (('partner_shift', 'Partner_Country'), ('office_shift', 'Customs_Office')):
+            shift, usual_share = share_shift(df, dim)
+            flag(kind, shift > SHIFT_THRESHOLD, shift, usual_share)
+
+        mismatch = quantity_mismatch(df)
+        flag('quantity_mismatch', mismatch, mismatch.astype('float64'), np.full(len(df), np.nan))
+
+        flags = pd.concat(flags, ignore_index=True)
+        flags['Alert'] = pd.Categorical(flags['Alert'], categories=list(ALERTS))
+        flags['Trade_Type'] = df['Trade_Type'].to_numpy()[flags['Row'].to_numpy()]
+
+        # Most severe first within each trade type and alert
+        flags['Severity'] = flags['Score'].abs()
+        self.flags = (
+            flags.sort_values(['Trade_Type', 'Alert', 'Severity'], ascending=[True, True, False], kind='stable')
+            .drop(columns='Severity')
+            .reset_index(drop=True)
+        )
+
+    def _select(self, trade_type, alerts=None):
+        flags = self.flags
+        mask = (flags['Trade_Type'] == trade_type).to_numpy()
+        if alerts:
+            mask &= flags['Alert'].isin(alerts).to_numpy()
+        return flags[mask]
+
+    def counts(self, trade_type):
+        """Number of flagged rows per alert for one trade type"""
+        selected = self._select(trade_type)
+        counts = selected['Alert'].value_counts()
+        return {alert: int(counts.get(alert, 0)) for alert in ALERTS}
+
+    def flagged(self, trade_type, alerts=None, limit=None):
+        """Flagged transactions of one trade type, most severe first, with Alert, Score and Expected"""
+        selected = self._select(trade_type, alerts)
+        if limit is not None:
+            selected = selected.groupby('Alert', observed=True, sort=False).head(limit)
+        rows = self.df.iloc[selected['Row'].to_numpy()].drop(columns='Trade_Type')
+        rows = rows.reset_index(drop=True)
+        rows['Alert'] = selected['Alert'].map(ALERTS).to_numpy()
+        rows['Score'] = selected['Score'].to_numpy()
+        rows['Expected'] = selected['Expected'].to_numpy()
+        return rows
+
+    def __len__(self):
+        return len(self.flags)
@@ -1,8 +1,20 @@
 # Import required libraries
+import json
+
 import dash
-from dash import html, dcc, callback, Input, Output, dash_table
+from dash import html, dcc, callback, Input, Output, State, dash_table
 import dash_bootstrap_components as dbc
-import pandas as pd
+
+import chat_context
+import config
+import export
+import instrumentation
+import jobs
+import raw_table
+import repository
+import transport
+from cache import create_cache
+from data_store import DataStore
 
 # Import page modules
 from pages import page1_executive, page2_countries, page3_products, page4_balance, page5_transport, page6_alerts, ai_chat
@@ -10,17 +22,37 @@ from pages import page1_executive, page2_countries, page3_products, page4_balanc
 # Initialize the Dash app
 app = dash.Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP], suppress_callback_exceptions=True)
 app.title = "MTID - Merchandise Trade Intelligence Dashboard"
+server = app.server
+
+# Compact, compressed callback responses (see transport.py)
+transport.install(app)
 
-# Load the data
-df_formal = pd.read_csv('data/formal_trade.csv')
-df_informal = pd.read_csv('data/informal_trade.csv')
+# Load the data (formal + informal with a Trade_Type column, see data_loader.py)
+# New versions of the CSVs are loaded in the background and swapped in, see data_store.py
+store = DataStore()
+# Every request works on the version that was current when it started
+server.before_request(store.pin)
+# Page callbacks filter this in every request; it resolves to the request's version.
+# Not a DataFrame: page modules pass df.current() (or a selection of df) to plotly express.
+df = store.frame()
 
-# Add a column to identify the trade type
-df_formal['Trade_Type'] = 'Formal'
-df_informal['Trade_Type'] = 'Informal'
+# Cache for page layouts and callback outputs, keyed on the dataset version
+callback_cache = create_cache()
 
-# Combine for easier filtering
-df = pd.concat([df_formal, df_informal], ignore_index=True)
+# Drop cached results of the old version whenever new data is swapped in
+store.on_swap(lambda dataset: callback_cache.clear())
+store.on_swap(lambda dataset: raw_table.clear_cache())
+# Aggregate queries for page callbacks and the chat assistant (repository.current())
+repository.bind(store)
+# Chat facts per dataset version, looked up per message (chat_context.context_for())
+chat_context.bind(store)
+# Score the Smart Alerts of the new version on the watcher thread, not on a page render
+store.on_swap(lambda dataset: dataset.alerts)
+if config.RELOAD_INTERVAL:
+    store.watch(config.RELOAD_INTERVAL)
+
+# Slow pages are built by background jobs shared across clients and workers (None: built in the request)
+job_manager = jobs.create_manager(lambda: store.current().version)
 
 # Sidebar Navigation
 sidebar = html.Div([
@@ -61,17 +93,159 @@ sidebar = html.Div([
     })
 ], style={'width': '250px'})
 
-# Main Content Area
-content = html.Div(id='page-content', style={
+# Static Page Chrome (built once at startup, toggled client-side)
+PAGE_TITLES = {
+    'page1': "📊 Page 1: Executive Trade Overview",
+    'page2': "🌍 Page 2: Trade by Partner Country",
+    'page3': "📦 Page 3: Product-Level Trade Analysis",
+    'page4': "⚖️ Page 4: Trade Balance & Structure",
+    'page5': "🚢 Page 5: Transport Mode & Customs Insights",
+    'page6': "🚨 Page 6: Smart Alerts - Data Validation Support",
+    'page7': "📘 Page 7: Metadata, Methodology & Raw Data",
+}
+
+# Header for all pages
+header = dbc.Row([
+    dbc.Col([
+        html.H2("🌍 Merchandise Trade Intelligence Dashboard", className="text-primary mb-0"),
+        html.P("National Institute of Statistics Rwanda (NISR)", className="text-muted")
+    ], width=8),
+    dbc.Col([
+        html.P("Last Updated: -", id='header-last-updated', className="text-end text-muted mb-0"),
+        html.P("Viewing: FORMAL TRADE", id='header-trade-type', className="text-end fw-bold")
+    ], width=4)
+], className="mb-4")
+
+# Page 7: Metadata & Methodology
+page7_metadata = html.Div([
+    # Metadata Section
+    dbc.Row([
+        dbc.Col([
+            dbc.Card([
+                dbc.CardHeader(html.H5("📋 Metadata & Data Source", className="mb-0")),
+                dbc.CardBody([
+                    html.H6("Data Source", className="text-primary mb-2"),
+                    html.P("EUROTRACE / ASYCUDA++ / Rwanda Revenue Authority (RRA)", className="mb-3"),
+
+                    html.H6("Scope", className="text-primary mb-2"),
+                    html.P("Formal and Informal Merchandise Trade", className="mb-3"),
+
+                    html.H6("Coverage", className="text-primary mb-2"),
+                    html.P("All merchandise goods crossing Rwanda's borders (imports and exports)", className="mb-3"),
+
+                    html.H6("Exclusions", className="text-primary mb-2"),
+                    html.P("Trade in services, informal cross-border trade not captured by customs", className="mb-3"),
+
+                    html.H6("Publication Frequency", className="text-primary mb-2"),
+                    html.P("Quarterly, with annual aggregations", className="mb-3"),
+
+                    html.H6("Classification System", className="text-primary mb-2"),
+                    html.P("Harmonized System (HS) - International standard for classifying traded products", className="mb-3"),
+
+                    html.H6("Currency", className="text-primary mb-2"),
+                    html.P("All values reported in United States Dollars (USD)", className="mb-0"),
+                ])
+            ], className="shadow-sm mb-4")
+        ], width=6),
+        dbc.Col([
+            dbc.Card([
+                dbc.CardHeader(html.H5("🔬 Methodology", className="mb-0")),
+                dbc.CardBody([
+                    html.H6("Data Collection", className="text-primary mb-2"),
+                    html.P("Data is collected at customs border posts using ASYCUDA++ system", className="mb-3"),
+
+                    html.H6("Valuation Method", className="text-primary mb-2"),
+                    html.P("FOB (Free on Board) for exports, CIF (Cost, Insurance, Freight) for imports", className="mb-3"),
+
+                    html.H6("Data Quality Control", className="text-primary mb-2"),
+                    html.Ul([
+                        html.Li("Automated validation checks in ASYCUDA++"),
+                        html.Li("Manual review by customs officers"),
+                        html.Li("Statistical validation by NISR analysts"),
+                        html.Li("Cross-verification with partner country data (mirror statistics)")
+                    ], className="mb-3"),
+
+                    html.H6("Confidentiality", className="text-primary mb-2"),
+                    html.P("Individual trader information is protected. Only aggregated statistics are published.", className="mb-3"),
+
+                    html.H6("Contact Information", className="text-primary mb-2"),
+                    html.P([
+                        "National Institute of Statistics of Rwanda (NISR)",
+                        html.Br(),
+                        "Email: info@statistics.gov.rw",
+                        html.Br(),
+                        "Website: www.statistics.gov.rw"
+                    ], className="mb-0"),
+                ])
+            ], className="shadow-sm mb-4")
+        ], width=6),
+    ]),
+    
+    html.Hr(),
+], id='page7-metadata', style={'display': 'none'})
+
+# Page 7: Data Dictionary
+page7_dictionary = html.Div([
+    html.Hr(),
+    
+    # Data Dictionary
+    dbc.Row([
+        dbc.Col([
+            dbc.Card([
+                dbc.CardHeader(html.H5("📖 Data Dictionary", className="mb-0")),
+                dbc.CardBody([
+                    html.P("Explanation of all columns in the dataset:", className="fw-bold mb-3"),
+
+                    html.Table([
+                        html.Thead([
+                            html.Tr([
+                                html.Th("Column Name", style={'width': '20%'}),
+                                html.Th("Type", style={'width': '15%'}),
+                                html.Th("Description", style={'width': '65%'})
+                            ])
+                        ]),
+                        html.Tbody([
+                            html.Tr([html.Td("Year"), html.Td("Numeric"), html.Td("Calendar year of the trade transaction")]),
+                            html.Tr([html.Td("Quarter"), html.Td("Text"), html.Td("Quarter of the year (Q1, Q2, Q3, Q4)")]),
+                            html.Tr([html.Td("Month"), html.Td("Text"), html.Td("Month when the trade occurred")]),
+                            html.Tr([html.Td("Flow"), html.Td("Categorical"), html.Td("Direction of trade: Export or Import")]),
+                            html.Tr([html.Td("HS2"), html.Td("Text"), html.Td("2-digit Harmonized System code (broad product category)")]),
+                            html.Tr([html.Td("HS4"), html.Td("Text"), html.Td("4-digit Harmonized System code (product sub-category)")]),
+                            html.Tr([html.Td("HS_Code"), html.Td("Text"), html.Td("6-digit Harmonized System code (detailed product)")]),
+                            html.Tr([html.Td("HS_Description"), html.Td("Text"), html.Td("Description of the product")]),
+                            html.Tr([html.Td("Partner_Country"), html.Td("Text"), html.Td("Destination country (exports) or origin country (imports)")]),
+                            html.Tr([html.Td("Region"), html.Td("Text"), html.Td("Geographic/economic region of partner country")]),
+                            html.Tr([html.Td("Trade_Value_USD"), html.Td("Numeric"), html.Td("Monetary value of trade in US Dollars")]),
+                            html.Tr([html.Td("Quantity"), html.Td("Numeric"), html.Td("Physical quantity of goods traded")]),
+                            html.Tr([html.Td("Unit"), html.Td("Text"), html.Td("Measurement unit for quantity (Kg, Tonnes, Units, etc.)")]),
+                            html.Tr([html.Td("Mode_of_Transport"), html.Td("Text"), html.Td("How goods were transported (Road, Air, Sea)")]),
+                            html.Tr([html.Td("Customs_Office"), html.Td("Text"), html.Td("Border post where trade was recorded")]),
+                        ])
+                    ], className="table table-striped table-hover")
+                ])
+            ], className="shadow-sm")
+        ], width=12)
+    ]),
+], id='page7-dictionary', style={'display': 'none'})
+
+# Main Content Area (only 'page-content' is filled by the server)
+content = html.Div([
+    header,
+    html.Hr(),
+    html.H3(PAGE_TITLES['page1'], id='page-title', className="mb-4"),
+    page7_metadata,
+    html.Div(id='page-content'),
+    page7_dictionary,
+], style={
     'margin-left': '250px',
     'padding': '20px'
 })
 
 # App Layout
 app.layout = html.Div([
-    # Hidden div to store current page and trade type
-    html.Div(id='current-page', style={'display': 'none'}, children='page1'),
-    html.Div(id='selected-trade-type', style={'display': 'none'}, children='Formal'),
+    # Client-side state: current page and trade type
+    dcc.Store(id='current-page', data='page1'),
+    dcc.Store(id='selected-trade-type', data='Formal'),
     
     # Sidebar and Content
     sidebar,
@@ -81,9 +255,16 @@ app.layout = html.Div([
     ai_chat.chat_interface()
 ])
 
-# Callback: Update Trade Type Selection
-@callback(
-    Output('selected-trade-type', 'children'),
+# Callback: Update Trade Type Selection (runs in the browser)
+app.clientside_callback(
+    """
+    function(formalClicks, informalClicks) {
+        const triggered = dash_clientside.callback_context.triggered.map(t => t.prop_id);
+        const informal = triggered.includes('btn-informal.n_clicks');
+        return [informal ? 'Informal' : 'Formal', 'light', informal, 'light', !informal];
+    }
+    """,
+    Output('selected-trade-type', 'data'),
     Output('btn-formal', 'color'),
     Output('btn-formal', 'outline'),
     Output('btn-informal', 'color'),
@@ -91,22 +272,19 @@ app.layout = html.Div([
     Input('btn-formal', 'n_clicks'),
     Input('btn-informal', 'n_clicks')
 )
-def update_trade_type(formal_clicks, informal_clicks):
-    """Update selected trade type and button styles"""
-    ctx = dash.callback_context
-    if not ctx.triggered:
-        return 'Formal', 'light', False, 'light', True
-    
-    button_id = ctx.triggered[0]['prop_id'].split('.')[0]
-    
-    if button_id == 'btn-formal':
-        return 'Formal', 'light', False, 'light', True
-    else:
-        return 'Informal', 'light', True, 'light', False
 
-# Callback: Update Active Page
-@callback(
-    Output('current-page', 'children'),
+# Callback: Update Active Page (runs in the browser)
+app.clientside_callback(
+    """
+    function() {
+        const pages = ['page1', 'page2', 'page3', 'page4', 'page5', 'page6', 'page7'];
+        const triggered = dash_clientside.callback_context.triggered.map(t => t.prop_id.split('.')[0]);
+        const navId = triggered.find(id => id.startsWith('nav-page'));
+        const page = navId ? navId.slice('nav-'.length) : 'page1';
+        return [page].concat(pages.map(p => p === page));
+    }
+    """,
+    Output('current-page', 'data'),
     Output('nav-page1', 'active'),
     Output('nav-page2', 'active'),
     Output('nav-page3', 'active'),
@@ -122,239 +300,137 @@ def update_trade_type(formal_clicks, informal_clicks):
     Input('nav-page6', 'n_clicks'),
     Input('nav-page7', 'n_clicks'),
 )
-def update_page(n1, n2, n3, n4, n5, n6, n7):
-    """Update current page and navigation highlighting"""
-    ctx = dash.callback_context
-    if not ctx.triggered:
-        return 'page1', True, False, False, False, False, False, False
-    
-    button_id = ctx.triggered[0]['prop_id'].split('.')[0]
-    
-    # Map button to page
-    page_map = {
-        'nav-page1': ('page1', True, False, False, False, False, False, False),
-        'nav-page2': ('page2', False, True, False, False, False, False, False),
-        'nav-page3': ('page3', False, False, True, False, False, False, False),
-        'nav-page4': ('page4', False, False, False, True, False, False, False),
-        'nav-page5': ('page5', False, False, False, False, True, False, False),
-        'nav-page6': ('page6', False, False, False, False, False, True, False),
-        'nav-page7': ('page7', False, False, False, False, False, False, True),
+
+# Callback: Page Title, Header and Page 7 Static Sections (runs in the browser)
+app.clientside_callback(
+    """
+    function(page, tradeType) {
+        const titles = %s;
+        const page7 = {'display': page === 'page7' ? 'block' : 'none'};
+        return [titles[page] || '', 'Viewing: ' + tradeType.toUpperCase() + ' TRADE', page7, page7];
     }
-    
-    return page_map.get(button_id, ('page1', True, False, False, False, False, False, False))
+    """ % json.dumps(PAGE_TITLES),
+    Output('page-title', 'children'),
+    Output('header-trade-type', 'children'),
+    Output('page7-metadata', 'style'),
+    Output('page7-dictionary', 'style'),
+    Input('current-page', 'data'),
+    Input('selected-trade-type', 'data')
+)
+
+# Pages whose layouts are slow enough to build in a background job
+BACKGROUND_PAGES = {
+    'page4': page4_balance,
+    'page6': page6_alerts,
+}
+
+
+def page_job_placeholder(page):
+    """Progress bar, filled in by the background job that builds the page"""
+    return html.Div([
+        dcc.Store(id='page-job', data=page),
+        dbc.Progress(id='page-job-progress', value=0, striped=True, animated=True, className="mb-3"),
+        html.Div(id='page-job-content'),
+    ])
+
 
 # Callback: Display Page Content
 @callback(
     Output('page-content', 'children'),
-    Input('current-page', 'children'),
-    Input('selected-trade-type', 'children')
+    Output('header-last-updated', 'children'),
+    Input('current-page', 'data')
 )
-def display_page(page, trade_type):
-    """Display the selected page content"""
+@callback_cache.memoize(lambda: store.current().version)
+def display_page(page):
+    """Display the data-driven part of the selected page"""
     
-    # Header for all pages
-    header = dbc.Row([
-        dbc.Col([
-            html.H2("🌍 Merchandise Trade Intelligence Dashboard", className="text-primary mb-0"),
-            html.P("National Institute of Statistics Rwanda (NISR)", className="text-muted")
-        ], width=8),
-        dbc.Col([
-            html.P("Last Updated: January 2026", className="text-end text-muted mb-0"),
-            html.P(f"Viewing: {trade_type.upper()} TRADE", className="text-end fw-bold")
-        ], width=4)
-    ], className="mb-4")
+    dataset = store.current()
+    df = dataset.df
+    last_updated = f"Last Updated: {dataset.loaded_at:%d %B %Y, %H:%M}"
+    
+    if job_manager is not None and page in BACKGROUND_PAGES:
+        return page_job_placeholder(page), last_updated
     
     if page == 'page1':
-        return html.Div([
-            header,
-            html.Hr(),
-            html.H3("📊 Page 1: Executive Trade Overview", className="mb-4"),
-            page1_executive.layout(df)
-        ])
+        return page1_executive.layout(df), last_updated
     
     elif page == 'page2':
-     return html.Div([
-         header,
-        html.Hr(),
-        html.H3("🌍 Page 2: Trade by Partner Country", className="mb-4"),
-        page2_countries.layout(df)
-    ])
+        return page2_countries.layout(df), last_updated
     
     elif page == 'page3':
-     return html.Div([
-        header,
-        html.Hr(),
-        html.H3("📦 Page 3: Product-Level Trade Analysis", className="mb-4"),
-        page3_products.layout(df)
-    ])
+        return page3_products.layout(df), last_updated
     
     elif page == 'page4':
-     return html.Div([
-        header,
-        html.Hr(),
-        html.H3("⚖️ Page 4: Trade Balance & Structure", className="mb-4"),
-        page4_balance.layout(df)
-    ])
+        return page4_balance.layout(df), last_updated
     
     elif page == 'page5':
-     return html.Div([
-        header,
-        html.Hr(),
-        html.H3("🚢 Page 5: Transport Mode & Customs Insights", className="mb-4"),
-        page5_transport.layout(df)
-    ])
+        return page5_transport.layout(df), last_updated
     
     elif page == 'page6':
-     return html.Div([
-        header,
-        html.Hr(),
-        html.H3("🚨 Page 6: Smart Alerts - Data Validation Support", className="mb-4"),
-        page6_alerts.layout(df)
-    ])
+        return page6_alerts.layout(df), last_updated
     
     elif page == 'page7':
-     return html.Div([
-        header,
-        html.Hr(),
-        html.H3("📘 Page 7: Metadata, Methodology & Raw Data", className="mb-4"),
-        
-        # Metadata Section
-        dbc.Row([
-            dbc.Col([
-                dbc.Card([
-                    dbc.CardHeader(html.H5("📋 Metadata & Data Source", className="mb-0")),
-                    dbc.CardBody([
-                        html.H6("Data Source", className="text-primary mb-2"),
-                        html.P("EUROTRACE / ASYCUDA++ / Rwanda Revenue Authority (RRA)", className="mb-3"),
-                        
-                        html.H6("Scope", className="text-primary mb-2"),
-                        html.P("Formal and Informal Merchandise Trade", className="mb-3"),
-                        
-                        html.H6("Coverage", className="text-primary mb-2"),
-                        html.P("All merchandise goods crossing Rwanda's borders (imports and exports)", className="mb-3"),
-                        
-                        html.H6("Exclusions", className="text-primary mb-2"),
-                        html.P("Trade in services, informal cross-border trade not captured by customs", className="mb-3"),
-                        
-                        html.H6("Publication Frequency", className="text-primary mb-2"),
-                        html.P("Quarterly, with annual aggregations", className="mb-3"),
-                        
-                        html.H6("Classification System", className="text-primary mb-2"),
-                        html.P("Harmonized System (HS) - International standard for classifying traded products", className="mb-3"),
-                        
-                        html.H6("Currency", className="text-primary mb-2"),
-                        html.P("All values reported in United States Dollars (USD)", className="mb-0"),
-                    ])
-                ], className="shadow-sm mb-4")
-            ], width=6),
-            dbc.Col([
-                dbc.Card([
-                    dbc.CardHeader(html.H5("🔬 Methodology", className="mb-0")),
-                    dbc.CardBody([
-                        html.H6("Data Collection", className="text-primary mb-2"),
-                        html.P("Data is collected at customs border posts using ASYCUDA++ system", className="mb-3"),
-                        
-                        html.H6("Valuation Method", className="text-primary mb-2"),
-                        html.P("FOB (Free on Board) for exports, CIF (Cost, Insurance, Freight) for imports", className="mb-3"),
-                        
-                        html.H6("Data Quality Control", className="text-primary mb-2"),
-                        html.Ul([
-                            html.Li("Automated validation checks in ASYCUDA++"),
-                            html.Li("Manual review by customs officers"),
-                            html.Li("Statistical validation by NISR analysts"),
-                            html.Li("Cross-verification with partner country data (mirror statistics)")
-                        ], className="mb-3"),
-                        
-                        html.H6("Confidentiality", className="text-primary mb-2"),
-                        html.P("Individual trader information is protected. Only aggregated statistics are published.", className="mb-3"),
-                        
-                        html.H6("Contact Information", className="text-primary mb-2"),
-                        html.P([
-                            "National Institute of Statistics of Rwanda (NISR)",
-                            html.Br(),
-                            "Email: info@statistics.gov.rw",
-                            html.Br(),
-                            "Website: www.statistics.gov.rw"
-                        ], className="mb-0"),
-                    ])
-                ], className="shadow-sm mb-4")
-            ], width=6),
-        ]),
-        
-        html.Hr(),
-        
-        # Raw Dataset Section
-dbc.Row([
-    dbc.Col([
-        dbc.Card([
-            dbc.CardHeader(html.H5("📊 Raw Dataset Viewer", className="mb-0")),
-            dbc.CardBody([
-                html.P([
-                    "This is the complete raw dataset used throughout the dashboard. ",
-                    "The dataset shown matches your current trade type selection (Formal/Informal) from the sidebar buttons. ",
-                    "You can search, filter, sort, and export the data to Excel using the button in the top-right of the table."
-                ], className="text-muted mb-3"),
+        return html.Div([
+            # Raw Dataset Section
+            dbc.Row([
+                dbc.Col([
+                    dbc.Card([
+                        dbc.CardHeader(html.H5("📊 Raw Dataset Viewer", className="mb-0")),
+                        dbc.CardBody([
+                            html.P([
+                                "This is the complete raw dataset used throughout the dashboard. ",
+                                "The dataset shown matches your current trade type selection (Formal/Informal) from the sidebar buttons. ",
+                                "You can search, filter, sort, and download the filtered data as CSV, Excel or Parquet using the links above the table."
+                            ], className="text-muted mb-3"),
                 
-                html.P([
-                    html.Strong("💡 Tip: "),
-                    "Use the filter boxes below each column header to search for specific values. ",
-                    "Click column headers to sort. Click the 'Export' button to download as Excel."
-                ], className="text-info small mb-3"),
+                            html.P([
+                                html.Strong("💡 Tip: "),
+                                "Use the filter boxes below each column header to search for specific values. ",
+                                "Click column headers to sort. Downloads include every matching row, in the current sort order."
+                            ], className="text-info small mb-3"),
                 
-                # Dataset Info
-                html.Div(id='p7-dataset-info', className="mb-3"),
+                            # Dataset Info
+                            html.Div(id='p7-dataset-info', className="mb-3"),
                 
-                # Data Table
-                html.Div(id='p7-raw-data-table')
-            ])
-        ], className="shadow-sm")
-    ], width=12)
-]),
-        
-        html.Hr(),
-        
-        # Data Dictionary
-        dbc.Row([
-            dbc.Col([
-                dbc.Card([
-                    dbc.CardHeader(html.H5("📖 Data Dictionary", className="mb-0")),
-                    dbc.CardBody([
-                        html.P("Explanation of all columns in the dataset:", className="fw-bold mb-3"),
-                        
-                        html.Table([
-                            html.Thead([
-                                html.Tr([
-                                    html.Th("Column Name", style={'width': '20%'}),
-                                    html.Th("Type", style={'width': '15%'}),
-                                    html.Th("Description", style={'width': '65%'})
-                                ])
-                            ]),
-                            html.Tbody([
-                                html.Tr([html.Td("Year"), html.Td("Numeric"), html.Td("Calendar year of the trade transaction")]),
-                                html.Tr([html.Td("Quarter"), html.Td("Text"), html.Td("Quarter of the year (Q1, Q2, Q3, Q4)")]),
-                                html.Tr([html.Td("Month"), html.Td("Text"), html.Td("Month when the trade occurred")]),
-                                html.Tr([html.Td("Flow"), html.Td("Categorical"), html.Td("Direction of trade: Export or Import")]),
-                                html.Tr([html.Td("HS2"), html.Td("Text"), html.Td("2-digit Harmonized System code (broad product category)")]),
-                                html.Tr([html.Td("HS4"), html.Td("Text"), html.Td("4-digit Harmonized System code (product sub-category)")]),
-                                html.Tr([html.Td("HS_Code"), html.Td("Text"), html.Td("6-digit Harmonized System code (detailed product)")]),
-                                html.Tr([html.Td("HS_Description"), html.Td("Text"), html.Td("Description of the product")]),
-                                html.Tr([html.Td("Partner_Country"), html.Td("Text"), html.Td("Destination country (exports) or origin country (imports)")]),
-                                html.Tr([html.Td("Region"), html.Td("Text"), html.Td("Geographic/economic region of partner country")]),
-                                html.Tr([html.Td("Trade_Value_USD"), html.Td("Numeric"), html.Td("Monetary value of trade in US Dollars")]),
-                                html.Tr([html.Td("Quantity"), html.Td("Numeric"), html.Td("Physical quantity of goods traded")]),
-                                html.Tr([html.Td("Unit"), html.Td("Text"), html.Td("Measurement unit for quantity (Kg, Tonnes, Units, etc.)")]),
-                                html.Tr([html.Td("Mode_of_Transport"), html.Td("Text"), html.Td("How goods were transported (Road, Air, Sea)")]),
-                                html.Tr([html.Td("Customs_Office"), html.Td("Text"), html.Td("Border post where trade was recorded")]),
-                            ])
-                        ], className="table table-striped table-hover")
-                    ])
-                ], className="shadow-sm")
-            ], width=12)
-        ]),
-    ])
+                            # Export (streamed by the server with the table's filter and sort)
+                            html.Div([
+                                html.Span("⬇️ Download:", className="text-muted small me-2"),
+                                html.A("CSV", id='p7-export-csv', href='#', className="btn btn-outline-primary btn-sm me-2"),
+                                html.A("Excel", id='p7-export-xlsx', href='#', className="btn btn-outline-primary btn-sm me-2"),
+                                html.A("Parquet", id='p7-export-parquet', href='#', className="btn btn-outline-primary btn-sm"),
+                            ], className="mb-3"),
+                
+                            # Data Table
+                            html.Div(id='p7-raw-data-table')
+                        ])
+                    ], className="shadow-sm")
+                ], width=12)
+            ]),
+        ]), last_updated
     
-    return html.Div([header, html.P("Page not found")])
+    return html.P("Page not found"), last_updated
+
+# Callback: Build a Slow Page in a Background Job
+if job_manager is not None:
+    @callback(
+        Output('page-job-content', 'children'),
+        Input('page-job', 'data'),
+        background=True,
+        manager=job_manager,
+        progress=[Output('page-job-progress', 'value'), Output('page-job-progress', 'label')],
+        running=[(Output('page-job-progress', 'style'), {'display': 'flex'}, {'display': 'none'})],
+        interval=250,
+    )
+    def build_page_job(set_progress, page):
+        """Build the layout of one of BACKGROUND_PAGES outside the web worker"""
+        set_progress((10, "Loading data"))
+        dataset = store.current()
+        set_progress((40, "Computing"))
+        layout = BACKGROUND_PAGES[page].layout(dataset.df)
+        set_progress((100, "Done"))
+        return layout
 
+# Register page callbacks (df follows the swapped-in versions, see data_store.CurrentFrame)
 # Register Page 1 callbacks
 page1_executive.register_callbacks(app, df)
 
@@ -374,18 +450,18 @@ ai_chat.register_callbacks(app, df)
 @callback(
     Output('p7-dataset-info', 'children'),
     Output('p7-raw-data-table', 'children'),
-    Input('selected-trade-type', 'children')
+    Input('selected-trade-type', 'data')
 )
+@callback_cache.memoize(lambda: store.current().version)
 def update_raw_dataset(trade_type):
     """Update raw dataset view based on selected trade type"""
     
+    dataset = store.current()
+    queries = repository.open_repository(dataset)
+    
     try:
-        # Filter data by trade type
-        display_df = df[df['Trade_Type'] == trade_type].copy()
-        
-        # Remove Trade_Type column from display
-        if 'Trade_Type' in display_df.columns:
-            display_df = display_df.drop('Trade_Type', axis=1)
+        # Rows of the selected trade type (a view, rows are paged on the server)
+        display_df = dataset.partition(trade_type)
         
         # Check if we have data
         if len(display_df) == 0:
@@ -399,16 +475,23 @@ def update_raw_dataset(trade_type):
             html.Strong(f"Currently viewing: {trade_type} Trade Dataset"),
             html.Br(),
             f"📊 Total Records: {len(display_df):,} | ",
-            f"📋 Columns: {len(display_df.columns)} | ",
-            f"📅 Years: {', '.join(map(str, sorted(display_df['Year'].unique())))} | ",
-            f"📆 Quarters: {', '.join(sorted(display_df['Quarter'].unique()))}"
+            f"📋 Columns: {len(dataset.columns)} | ",
+            f"📅 Years: {', '.join(map(str, queries.values('Year', trade_type=trade_type)))} | ",
+            f"📆 Quarters: {', '.join(queries.values('Quarter', trade_type=trade_type))}"
         ], color="primary" if trade_type == "Formal" else "success")
         
         # Create interactive data table
         data_table = dash_table.DataTable(
             id='raw-data-table-display',
-            data=display_df.to_dict('records'),
-            columns=[{'name': col, 'id': col, 'deletable': False} for col in display_df.columns],
+            data=[],
+            columns=[
+                {
+                    'name': col,
+                    'id': col,
+                    'deletable': False,
+                    'type': 'numeric' if col in raw_table.NUMERIC_COLUMNS else 'text'
+                } for col in dataset.columns
+            ],
             
             # Styling
             style_table={
@@ -456,19 +539,18 @@ def update_raw_dataset(trade_type):
                 }
             ],
             
-            # Features
-            page_size=20,
-            page_action='native',
+            # Features (paging, sorting and filtering run on the server)
+            page_size=config.RAW_TABLE_PAGE_SIZE,
+            page_action='custom',
             page_current=0,
+            page_count=max(1, -(-len(display_df) // config.RAW_TABLE_PAGE_SIZE)),
             
-            sort_action='native',
+            sort_action='custom',
             sort_mode='multi',
+            sort_by=[],
             
-            filter_action='native',
-            
-            # Export functionality
-            export_format='xlsx',
-            export_headers='display',
+            filter_action='custom',
+            filter_query='',
             
             # Column resizing
             style_cell_conditional=[
@@ -489,17 +571,13 @@ def update_raw_dataset(trade_type):
                 {'if': {'column_id': 'Customs_Office'}, 'width': '150px'},
             ],
             
-            # Tooltips
-            tooltip_data=[
-                {
-                    column: {'value': str(value), 'type': 'markdown'}
-                    for column, value in row.items()
-                } for row in display_df.to_dict('records')
-            ],
+            # Tooltips (filled in per page by update_raw_table_page)
+            tooltip_data=[],
             tooltip_duration=None
         )
         
-        return dataset_info, data_table
+        # Pages arrive in columnar form and are expanded into rows in the browser
+        return dataset_info, html.Div([dcc.Store(id='raw-data-table-page'), data_table])
     
     except Exception as e:
         error_msg = dbc.Alert([
@@ -508,6 +586,77 @@ def update_raw_dataset(trade_type):
         ], color="danger")
         
         return error_msg, html.P("Unable to load data table.")
+
+# Page 7: Raw Dataset Paging, Sorting and Filtering
+@callback(
+    Output('raw-data-table-page', 'data'),
+    Output('raw-data-table-display', 'tooltip_data'),
+    Output('raw-data-table-display', 'page_count'),
+    Output('raw-data-table-display', 'page_current'),
+    Input('raw-data-table-display', 'page_current'),
+    Input('raw-data-table-display', 'page_size'),
+    Input('raw-data-table-display', 'sort_by'),
+    Input('raw-data-table-display', 'filter_query'),
+    State('selected-trade-type', 'data')
+)
+def update_raw_table_page(page_current, page_size, sort_by, filter_query, trade_type):
+    """Return only the current page of the filtered and sorted raw dataset"""
+    
+    # Go back to the first page whenever the filter or sort changes
+    ctx = dash.callback_context
+    triggered = {t['prop_id'].split('.')[-1] for t in ctx.triggered}
+    if triggered & {'sort_by', 'filter_query'}:
+        page_current = 0
+    
+    dataset = store.current()
+    page_size = page_size or config.RAW_TABLE_PAGE_SIZE
+    raw_df = dataset.partition(trade_type)
+    page_df, total = raw_table.query_page(
+        (dataset.version, trade_type), raw_df, page_current, page_size, sort_by, filter_query
+    )
+    
+    # Tooltips only for the long text columns of this page, and not at all for large datasets
+    tooltip_data = []
+    if config.RAW_TABLE_TOOLTIPS and len(raw_df) <= config.RAW_TABLE_TOOLTIP_MAX_ROWS:
+        tooltip_data = raw_table.page_tooltips(
+            page_df, config.RAW_TABLE_TOOLTIP_COLUMNS, config.RAW_TABLE_TOOLTIP_MIN_LENGTH
+        )
+    
+    return transport.columnar(page_df, dataset.columns), tooltip_data, max(1, -(-total // page_size)), page_current or 0
+
+# Page 7: Table Rows from the Columnar Page (runs in the browser)
+app.clientside_callback(
+    transport.RECORDS_JS,
+    Output('raw-data-table-display', 'data'),
+    Input('raw-data-table-page', 'data')
+)
+
+# Page 7: Export Links (runs in the browser, the download itself is streamed by export.py)
+app.clientside_callback(
+    """
+    function(filterQuery, sortBy, tradeType) {
+        const query = new URLSearchParams({
+            trade_type: tradeType,
+            filter_query: filterQuery || '',
+            sort_by: JSON.stringify(sortBy || [])
+        }).toString();
+        return ['csv', 'xlsx', 'parquet'].map(fmt => '/export/raw-data.' + fmt + '?' + query);
+    }
+    """,
+    Output('p7-export-csv', 'href'),
+    Output('p7-export-xlsx', 'href'),
+    Output('p7-export-parquet', 'href'),
+    Input('raw-data-table-display', 'filter_query'),
+    Input('raw-data-table-display', 'sort_by'),
+    Input('selected-trade-type', 'data')
+)
+
+# Page 7: Export Endpoint
+export.register_routes(app, store)
+
+# Callback instrumentation (opt-in with MTID_METRICS, wraps everything registered above)
+instrumentation.install(app)
+
 # Run the app
 if __name__ == '__main__':
     app.run(debug=True, port=8050)
\ No newline at end of file
@@ -0,0 +1,52 @@
+# Smart Alerts: time to score a dataset version once vs looking up flagged rows
+#
+#   python -m benchmarks.bench_alerts [--rows 1000000]
+import argparse
+import time
+
+import data_loader
+from benchmarks.synthetic import make_trade_frame
+from dataset import TradeDataset
+
+CATEGORY_COLUMNS = [
+    'Quarter', 'Month', 'Flow', 'HS2', 'HS4', 'HS_Code', 'HS_Description', 'Partner_Country', 'Region',
+    'Unit', 'Mode_of_Transport', 'Customs_Office',
+]
+
+
+def make_dataset(n_rows, informal_share=0.25):
+    frames = []
+    for seed, (trade_type, share) in enumerate((('Formal', 1 - informal_share), ('Informal', informal_share))):
+        frame = make_trade_frame(int(n_rows * share), seed=seed)
+        for col in CATEGORY_COLUMNS:
+            frame[col] = frame[col].astype('category')
+        frame['Trade_Type'] = trade_type
+        frames.append(frame)
+    return TradeDataset(data_loader.concat_frames(frames))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Smart Alerts scoring benchmark")
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    dataset = make_dataset(args.rows)
+
+    start = time.perf_counter()
+    alerts = dataset.alerts
+    build_seconds = time.perf_counter() - start
+    print(f"Scored {len(dataset):,} rows in {build_seconds:.2f} s: "
+          f"{len(alerts):,} flags, {len(alerts.baselines):,} unit-value baselines")
+
+    for trade_type in ('Formal', 'Informal'):
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            rows = alerts.flagged(trade_type, limit=100)
+            counts = alerts.counts(trade_type)
+        lookup_ms = (time.perf_counter() - start) / args.repeat * 1000
+        print(f"{trade_type:>9}: {lookup_ms:.1f} ms per page render ({len(rows)} rows shown), {counts}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,420 @@
+# Callback latency, payload size, startup time and memory, in process and under concurrent users
+#
+#   python -m benchmarks.bench_callbacks [--rows 10000,100000,1000000,5000000] [--users 8]
+#                                        [--compare previous.json]
+#
+# For every dataset size, synthetic formal and informal CSVs are generated and
+# the app's callbacks are driven two ways:
+#
+#   direct    Dash's (Flask) test client in a fresh interpreter, one request at a time
+#   gunicorn  a local gunicorn (gunicorn.conf.py) with --users simulated users in parallel
+#
+# The requests are derived from the callback graph (/_dash-dependencies), so the
+# page modules' registered callbacks are covered without listing them here:
+# display_page renders every page, component properties are collected from the
+# returned layouts, and every server callback whose inputs exist on a page is
+# then called with those values, for both trade types.
+#
+# Background jobs, the callback cache and hot reload are switched off so every
+# request runs the computation; --cache keeps the callback cache. Other MTID_*
+# settings (MTID_DATA_MODE, MTID_QUERY_BACKEND, ...) are passed through and
+# recorded. Results go to a JSON file; --compare prints the p95 change per
+# callback against an earlier file.
+import argparse
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+
+import numpy as np
+
+from benchmarks.bench_roundtrips import split_outputs
+from benchmarks.synthetic import write_trade_csvs
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SIZES = [10_000, 100_000, 1_000_000, 5_000_000]
+PAGES = ['page1', 'page2', 'page3', 'page4', 'page5', 'page6', 'page7']
+TRADE_TYPES = ['Formal', 'Informal']
+PAGE_OUTPUT = 'page-content.children'
+
+# p95 slowdown reported as a regression by --compare (relative, and at least this many ms)
+REGRESSION_RATIO = 1.2
+REGRESSION_MIN_MS = 5.0
+
+CHILD = """
+import json, sys, time
+from benchmarks.bench_callbacks import TestClient, build_cases, run_cases, peak_rss_mb
+start = time.perf_counter()
+import app
+startup = time.perf_counter() - start
+client = TestClient(app.app.server.test_client())
+cases = build_cases(client)
+samples = run_cases(client, cases, int(sys.argv[1]))
+print(json.dumps({'startup_seconds': startup, 'samples': samples, 'peak_rss_mb': peak_rss_mb()}))
+"""
+
+
+def peak_rss_mb(pid='self'):
+    """VmHWM of a process; reset on exec, unlike ru_maxrss which inherits the parent's peak"""
+    with open(f'/proc/{pid}/status') as f:
+        for line in f:
+            if line.startswith('VmHWM:'):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+class TestClient:
+    """Flask test client of the app, in this process"""
+
+    def __init__(self, client):
+        self.client = client
+
+    def get_json(self, path):
+        return self.client.get(path).get_json()
+
+    def post(self, path, body):
+        response = self.client.post(path, json=body)
+        return response.status_code, response.data
+
+
+class HttpClient:
+    """Plain HTTP client of a running server"""
+
+    def __init__(self, base_url):
+        self.base_url = base_url
+
+    def get_json(self, path):
+        with urllib.request.urlopen(self.base_url + path, timeout=600) as response:
+            return json.loads(response.read())
+
+    def post(self, path, body):
+        request = urllib.request.Request(
+            self.base_url + path, data=json.dumps(body).encode(),
+            headers={'Content-Type': 'application/json'},
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=600) as response:
+                return response.status, response.read()
+        except urllib.error.HTTPError as error:
+            return error.code, error.read()
+
+
+def harvest(value, props):
+    """Collect the properties of every component with an id in a layout or callback response"""
+    if isinstance(value, list):
+        for item in value:
+            harvest(item, props)
+    elif isinstance(value, dict):
+        component = value.get('props')
+        if 'type' in value and isinstance(component, dict):
+            if isinstance(component.get('id'), str):
+                props.setdefault(component['id'], {}).update(
+                    {name: prop for name, prop in component.items() if name != 'children'}
+                )
+            for prop in component.values():
+                harvest(prop, props)
+
+
+def harvest_response(data, props):
+    response = json.loads(data).get('response', {})
+    for component_id, values in response.items():
+        props.setdefault(component_id, {}).update(values)
+        harvest(list(values.values()), props)
+
+
+def request_body(dependency, props):
+    """Body of one /_dash-update-component call, with the property values known so far"""
+    def spec(items):
+        return [
+            {'id': item['id'], 'property': item['property'], 'value': props.get(item['id'], {}).get(item['property'])}
+            for item in items
+        ]
+
+    outputs = [dict(zip(('id', 'property'), output.split('.'))) for output in split_outputs(dependency['output'])]
+    inputs = spec(dependency['inputs'])
+    return {
+        'output': dependency['output'],
+        'outputs': outputs if dependency['output'].startswith('..') else outputs[0],
+        'inputs': inputs,
+        'state': spec(dependency['state']),
+        'changedPropIds': [f"{inputs[0]['id']}.{inputs[0]['property']}"] if inputs else [],
+    }
+
+
+def component_ids(dependency):
+    ids = [item['id'] for item in dependency['inputs'] + dependency['state']]
+    return ids + [output.split('.')[0] for output in split_outputs(dependency['output'])]
+
+
+def build_cases(client):
+    """(label, request body) of every server callback a user can trigger, page by page and per trade type"""
+    dependencies = [
+        d for d in client.get_json('/_dash-dependencies')
+        # Clientside callbacks run in the browser; pattern-matching ids cannot be filled in generically
+        if not d.get('clientside_function') and not any(i.startswith('{') for i in component_ids(d))
+    ]
+    display_page = next(d for d in dependencies if PAGE_OUTPUT in split_outputs(d['output']))
+    shell = {}
+    harvest(client.get_json('/_dash-layout'), shell)
+
+    cases = []
+    for trade_type in TRADE_TYPES:
+        # 'app' is the shell itself (e.g. the Page 7 viewer); pages add their own components
+        for page in ['app'] + PAGES:
+            props = {component_id: dict(values) for component_id, values in shell.items()}
+            props['selected-trade-type']['data'] = trade_type
+            local = set()
+            if page != 'app':
+                props['current-page']['data'] = page
+                body = request_body(display_page, props)
+                status, data = client.post('/_dash-update-component', body)
+                if status != 200:
+                    raise RuntimeError(f"display_page({page}) failed with {status}: {data[:200]}")
+                before = set(props)
+                harvest_response(data, props)
+                local = set(props) - before
+                cases.append((f"{page}: display_page", body))
+
+            # Callbacks of this page, each once the components it reads exist
+            done = set()
+            pending = True
+            while pending:
+                pending = False
+                for number, dependency in enumerate(dependencies):
+                    ids = component_ids(dependency)
+                    if dependency is display_page or number in done or not all(i in props for i in ids):
+                        continue
+                    if page != 'app' and not local.intersection(ids):
+                        continue
+                    done.add(number)
+                    pending = True
+                    body = request_body(dependency, props)
+                    status, data = client.post('/_dash-update-component', body)
+                    if status == 200:
+                        before = set(props)
+                        harvest_response(data, props)
+                        local |= set(props) - before
+                    # Failing callbacks stay in, and show up in the errors column
+                    cases.append((f"{page}: {dependency['output'].strip('.')}", body))
+    return cases
+
+
+def run_cases(client, cases, repeat, samples=None):
+    """Latency (ms) and payload bytes per callback label, over `repeat` passes through all cases"""
+    samples = {} if samples is None else samples
+    for _ in range(repeat):
+        for label, body in cases:
+            start = time.perf_counter()
+            status, data = client.post('/_dash-update-component', body)
+            elapsed = (time.perf_counter() - start) * 1000
+            sample = samples.setdefault(label, {'ms': [], 'bytes': [], 'errors': 0})
+            sample['ms'].append(elapsed)
+            sample['bytes'].append(len(data))
+            sample['errors'] += status not in (200, 204)
+    return samples
+
+
+def summarize(samples):
+    """p50/p95 latency and mean payload per callback"""
+    return {
+        label: {
+            'calls': len(sample['ms']),
+            'p50_ms': float(np.percentile(sample['ms'], 50)),
+            'p95_ms': float(np.percentile(sample['ms'], 95)),
+            'payload_bytes': int(np.mean(sample['bytes'])),
+            'errors': sample['errors'],
+        }
+        for label, sample in sorted(samples.items())
+    }
+
+
+def bench_env(data_dir, args):
+    return dict(
+        os.environ,
+        MTID_DATA_DIR=data_dir,
+        MTID_DATA_CACHE_DIR=os.path.join(data_dir, '.cache'),
+        MTID_JOBS='0',
+        MTID_CACHE='1' if args.cache else '0',
+        MTID_RELOAD_INTERVAL='0',
+    )
+
+
+def run_direct(data_dir, args):
+    out = subprocess.run(
+        [sys.executable, '-c', CHILD, str(args.repeat)],
+        cwd=ROOT, env=bench_env(data_dir, args), check=True, capture_output=True, text=True,
+    )
+    result = json.loads(out.stdout.strip().splitlines()[-1])
+    return {
+        'startup_seconds': result['startup_seconds'],
+        'peak_rss_mb': result['peak_rss_mb'],
+        'callbacks': summarize(result['samples']),
+    }
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def worker_pids(pid):
+    with open(f'/proc/{pid}/task/{pid}/children') as f:
+        return [int(child) for child in f.read().split()]
+
+
+def run_gunicorn(data_dir, args):
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+         '--bind', f'127.0.0.1:{port}', '--workers', str(args.workers)],
+        cwd=ROOT, env=bench_env(data_dir, args), stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True,
+    )
+    try:
+        client = HttpClient(f'http://127.0.0.1:{port}')
+        start = time.perf_counter()
+        while True:
+            if server.poll() is not None:
+                raise RuntimeError(f"gunicorn exited: {server.stderr.read()[-2000:]}")
+            try:
+                client.get_json('/_dash-layout')
+                break
+            except OSError:
+                time.sleep(0.1)
+        startup = time.perf_counter() - start
+
+        # Every worker loads the app lazily; warm them all up before measuring
+        cases = build_cases(client)
+        for _ in range(args.workers):
+            run_cases(client, cases, 1)
+
+        samples = {}
+        lock = threading.Lock()
+
+        def user():
+            own = run_cases(client, cases, args.repeat)
+            with lock:
+                for label, sample in own.items():
+                    merged = samples.setdefault(label, {'ms': [], 'bytes': [], 'errors': 0})
+                    merged['ms'] += sample['ms']
+                    merged['bytes'] += sample['bytes']
+                    merged['errors'] += sample['errors']
+
+        users = [threading.Thread(target=user) for _ in range(args.users)]
+        start = time.perf_counter()
+        for thread in users:
+            thread.start()
+        for thread in users:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        requests = sum(len(sample['ms']) for sample in samples.values())
+        return {
+            'startup_seconds': startup,
+            'peak_rss_mb': sum(peak_rss_mb(pid) for pid in [server.pid] + worker_pids(server.pid)),
+            'workers': args.workers,
+            'users': args.users,
+            'requests_per_second': requests / elapsed,
+            'callbacks': summarize(samples),
+        }
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def print_run(rows, mode, run):
+    extra = f", {run['requests_per_second']:.1f} req/s" if 'requests_per_second' in run else ''
+    print(f"\n{rows:,} rows, {mode}: startup {run['startup_seconds']:.2f} s, "
+          f"peak RSS {run['peak_rss_mb']:.0f} MB{extra}")
+    print(f"{'callback':>60} {'p50 ms':>8} {'p95 ms':>8} {'bytes':>10} {'errors':>6}")
+    for label, stats in run['callbacks'].items():
+        print(f"{label[:60]:>60} {stats['p50_ms']:>8.1f} {stats['p95_ms']:>8.1f} "
+              f"{stats['payload_bytes']:>10,} {stats['errors']:>6}")
+
+
+def compare(previous, results):
+    """Print p95 latency and payload changes per callback against an earlier result file"""
+    print(f"\nCompared with {previous['commit']}:")
+    print(f"{'run':>22} {'callback':>50} {'p95 ms':>17} {'bytes':>23}")
+    for rows, runs in results['sizes'].items():
+        for mode, run in runs.items():
+            old_run = previous['sizes'].get(rows, {}).get(mode)
+            if old_run is None:
+                continue
+            for label, stats in run['callbacks'].items():
+                old = old_run['callbacks'].get(label)
+                if old is None:
+                    continue
+                ratio = stats['p95_ms'] / old['p95_ms'] if old['p95_ms'] else 1.0
+                slower = ratio > REGRESSION_RATIO and stats['p95_ms'] - old['p95_ms'] > REGRESSION_MIN_MS
+                flag = '  REGRESSION' if slower else ''
+                print(f"{f'{int(rows):,} {mode}':>22} {label[:50]:>50} "
+                      f"{old['p95_ms']:>8.1f}>{stats['p95_ms']:<8.1f} "
+                      f"{old['payload_bytes']:>11,}>{stats['payload_bytes']:<11,}{flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Callback load test and benchmark")
+    parser.add_argument('--rows', default=','.join(map(str, SIZES)),
+                        help="comma-separated dataset sizes")
+    parser.add_argument('--modes', default='direct,gunicorn')
+    parser.add_argument('--repeat', type=int, default=5, help="passes through all callbacks per user")
+    parser.add_argument('--users', type=int, default=8, help="concurrent users against gunicorn")
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('WEB_CONCURRENCY', 2)))
+    parser.add_argument('--cache', action='store_true', help="keep the callback cache on")
+    parser.add_argument('--data-dir', default='/tmp/mtid-bench')
+    parser.add_argument('--output', help="result file (default: <data-dir>/results/callbacks-<commit>.json)")
+    parser.add_argument('--compare', help="earlier result file to compare with")
+    args = parser.parse_args()
+
+    commit = git_commit()
+    results = {
+        'commit': commit,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'cpus': os.cpu_count(),
+        'settings': {name: value for name, value in sorted(os.environ.items()) if name.startswith('MTID_')},
+        'options': {'repeat': args.repeat, 'users': args.users, 'workers': args.workers, 'cache': args.cache},
+        'sizes': {},
+    }
+    for rows in (int(size) for size in args.rows.split(',')):
+        data_dir = os.path.join(args.data_dir, str(rows))
+        if not os.path.exists(os.path.join(data_dir, 'formal_trade.csv')):
+            print(f"Generating {rows:,} synthetic rows in {data_dir}")
+            write_trade_csvs(data_dir, rows)
+        # Build the caches up front, as a deployment would before taking traffic
+        subprocess.run([sys.executable, '-c', 'import data_loader; data_loader.load_dataset()'],
+                       cwd=ROOT, env=bench_env(data_dir, args), check=True)
+
+        runs = results['sizes'][str(rows)] = {}
+        for mode in args.modes.split(','):
+            runs[mode] = run_direct(data_dir, args) if mode == 'direct' else run_gunicorn(data_dir, args)
+            print_run(rows, mode, runs[mode])
+
+    output = args.output or os.path.join(args.data_dir, 'results', f'callbacks-{commit}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=1)
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), results)
+
+
+if __name__ == '__main__':
+    main()
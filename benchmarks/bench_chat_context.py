@@ -0,0 +1,57 @@
+# Chat context: building the data summaries per message vs looking them up in the per-version index
+#
+#   python -m benchmarks.bench_chat_context [--rows 1000000]
+#
+# The model is a local stub, so the numbers are the dashboard's share of a chat turn.
+import argparse
+import time
+
+import chat_context
+import repository
+from benchmarks.bench_alerts import make_dataset
+
+QUESTIONS = [
+    "How much did we export to Kenya?",
+    "Which partners buy the most coffee and tea?",
+    "What is the trade balance by quarter?",
+    "How much informal trade goes by road?",
+]
+
+
+def stub_model(question, context):
+    """Stands in for the chat model: answers with the size of the prompt it was given"""
+    return f"{len(question) + len(context)} characters, {context.count(chr(10)) + 1} facts"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chat context benchmark")
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    dataset = make_dataset(args.rows)
+    queries = repository.PandasRepository(dataset)
+    trade_types = ['Formal', 'Informal']
+
+    start = time.perf_counter()
+    index = chat_context.SummaryIndex(queries, trade_types)
+    build_ms = (time.perf_counter() - start) * 1000
+    print(f"Index of {len(dataset):,} rows built in {build_ms:.0f} ms (once per version): "
+          f"{len(index.names):,} entity names, {len(index.facts):,} fact groups")
+
+    for question in QUESTIONS:
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            answer = stub_model(question, index.context(question, 'Formal'))
+        lookup_ms = (time.perf_counter() - start) / args.repeat * 1000
+        found = ', '.join(name for _, name in index.lookup(question)) or 'none'
+        print(f"{lookup_ms:>7.2f} ms  {question!r}: entities {found}; stub model got {answer}")
+
+    # Previous behaviour: summaries recomputed from the rows on every message
+    start = time.perf_counter()
+    answer = stub_model(QUESTIONS[0], chat_context.SummaryIndex(queries, trade_types).context(QUESTIONS[0], 'Formal'))
+    print(f"{(time.perf_counter() - start) * 1000:>7.0f} ms  same turn with the summaries built per message")
+
+
+if __name__ == '__main__':
+    main()
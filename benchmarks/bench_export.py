@@ -0,0 +1,81 @@
+# Peak memory and throughput of the streamed raw-data export
+#
+#   python -m benchmarks.bench_export [--rows 1000000] [--formats csv parquet xlsx]
+import argparse
+import os
+import tempfile
+import time
+
+import export
+import raw_table
+from benchmarks.synthetic import make_trade_frame
+from dataset import TradeDataset
+
+
+def _rss_mb(field):
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith(field + ':'):
+                return int(line.split()[1]) / 1024
+
+
+def _reset_peak():
+    # Writing 5 to clear_refs resets VmHWM (the peak RSS) to the current RSS
+    with open('/proc/self/clear_refs', 'w') as f:
+        f.write('5')
+
+
+def run_csv_materialized(path, frame, positions, columns):
+    """Reference: build the whole filtered frame and file contents in memory"""
+    text = frame.iloc[positions][columns].to_csv(index=False)
+    with open(path, 'w') as f:
+        f.write(text)
+
+
+def run_csv(path, frame, positions, columns):
+    with open(path, 'w') as f:
+        for part in export.iter_csv(frame, positions, columns):
+            f.write(part)
+
+
+EXPORTS = {
+    'csv (in memory)': run_csv_materialized,
+    'csv': run_csv,
+    'parquet': export.write_parquet,
+    'xlsx': export.write_xlsx,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Streaming export benchmark")
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--formats', nargs='+', default=list(EXPORTS))
+    args = parser.parse_args()
+
+    frame = make_trade_frame(args.rows)
+    frame['Trade_Type'] = 'Formal'
+    dataset = TradeDataset(frame)
+    partition = dataset.partition('Formal')
+    sort_by = [{'column_id': 'Trade_Value_USD', 'direction': 'desc'}]
+    positions = raw_table.query_positions('Formal', partition, '', sort_by)
+
+    print(f"{args.rows:,} rows, sorted by Trade_Value_USD")
+    print(f"{'format':>16} {'seconds':>8} {'rows/s':>11} {'file MB':>8} {'peak +MB':>9}")
+    for name in args.formats:
+        fd, path = tempfile.mkstemp()
+        os.close(fd)
+        try:
+            _reset_peak()
+            baseline = _rss_mb('VmRSS')
+            start = time.perf_counter()
+            EXPORTS[name](path, partition, positions, dataset.columns)
+            seconds = time.perf_counter() - start
+            peak = _rss_mb('VmHWM') - baseline
+            size = os.path.getsize(path) / 1e6
+        finally:
+            os.remove(path)
+        print(f"{name:>16} {seconds:>8.2f} {len(positions) / seconds:>11,.0f} {size:>8.1f} {peak:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+# Peak memory of the chunked, schema-validated CSV loader vs a plain pd.read_csv
+#
+#   python -m benchmarks.bench_loader [--rows 2000000] [--chunk-rows 100000] [--bad-rows 1000]
+#
+# Exits with status 1 if the loader's peak memory above the interpreter baseline
+# exceeds the budget: CHUNK_FACTOR raw chunks plus the compact result.
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+
+from benchmarks.synthetic import write_trade_csvs
+
+# Copies of one raw text chunk alive at once while it is parsed and converted
+CHUNK_FACTOR = 3
+
+LOADERS = {
+    'read_csv': """
+import pandas as pd
+df = pd.read_csv(csv_path, on_bad_lines='skip')
+""",
+    'chunked': """
+import data_loader
+df = data_loader.read_trade_csv(csv_path)
+""",
+}
+
+CHILD = """
+def status_mb(field):
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith(field + ':'):
+                return int(line.split()[1]) / 1024
+
+import json, os, sys, time
+csv_path, chunk_rows = sys.argv[1], int(sys.argv[2])
+import pandas as pd
+import csv_loader
+
+# Size of one raw text chunk, the unit the loader's memory is bounded by
+chunk = next(iter(pd.read_csv(csv_path, dtype=str, keep_default_na=False, on_bad_lines='skip', chunksize=chunk_rows)))
+chunk_mb = chunk.memory_usage(deep=True).sum() / 1e6
+del chunk
+
+# Reset the high-water mark so the peak covers only the load
+with open('/proc/self/clear_refs', 'w') as f:
+    f.write('5')
+baseline_mb = status_mb('VmRSS')
+start = time.perf_counter()
+{loader}
+elapsed = time.perf_counter() - start
+print(json.dumps({{
+    'rows': len(df),
+    'seconds': elapsed,
+    'chunk_mb': chunk_mb,
+    'frame_mb': df.memory_usage(deep=True).sum() / 1e6,
+    'peak_mb': status_mb('VmHWM') - baseline_mb,
+}}))
+"""
+
+
+def add_bad_rows(csv_path, n_bad, seed=0):
+    """Corrupt n_bad random lines: extra fields, text in Year, unknown quarters"""
+    with open(csv_path) as f:
+        lines = f.readlines()
+    rng = np.random.default_rng(seed)
+    for i, line_no in enumerate(rng.choice(np.arange(1, len(lines)), n_bad, replace=False)):
+        # Only the leading fields are edited, later ones may be quoted and contain commas
+        fields = lines[line_no].rstrip('\n').split(',')
+        kind = i % 3
+        if kind == 0:
+            fields.append('extra')
+        elif kind == 1:
+            fields[0] = 'n/a'
+        else:
+            fields[1] = 'Q5'
+        lines[line_no] = ','.join(fields) + '\n'
+    with open(csv_path, 'w') as f:
+        f.writelines(lines)
+
+
+def run_loader(mode, csv_path, chunk_rows, cache_dir):
+    env = dict(os.environ, MTID_LOAD_CHUNK_ROWS=str(chunk_rows), MTID_DATA_CACHE_DIR=cache_dir)
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    out = subprocess.run(
+        [sys.executable, '-c', CHILD.format(loader=LOADERS[mode]), csv_path, str(chunk_rows)],
+        cwd=root, env=env, check=True, capture_output=True, text=True
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chunked CSV loader memory benchmark")
+    parser.add_argument('--rows', type=int, default=2_000_000)
+    parser.add_argument('--chunk-rows', type=int, default=100_000)
+    parser.add_argument('--bad-rows', type=int, default=1000)
+    parser.add_argument('--data-dir', default='/tmp/mtid-bench-loader')
+    args = parser.parse_args()
+
+    data_dir = os.path.join(args.data_dir, str(args.rows))
+    csv_path = os.path.join(data_dir, 'formal_trade.csv')
+    if not os.path.exists(csv_path):
+        print(f"Generating {args.rows:,} synthetic rows with {args.bad_rows:,} bad ones in {data_dir}")
+        write_trade_csvs(data_dir, args.rows, informal_share=0)
+        add_bad_rows(csv_path, args.bad_rows)
+    cache_dir = os.path.join(data_dir, '.cache')
+
+    print(f"{'mode':>9} {'rows':>10} {'seconds':>8} {'chunk MB':>9} {'frame MB':>9} {'peak MB':>8}")
+    results = {}
+    for mode in LOADERS:
+        result = results[mode] = run_loader(mode, csv_path, args.chunk_rows, cache_dir)
+        print(f"{mode:>9} {result['rows']:>10,} {result['seconds']:>8.2f} {result['chunk_mb']:>9.1f} "
+              f"{result['frame_mb']:>9.1f} {result['peak_mb']:>8.1f}")
+
+    import csv_loader
+    with open(os.path.join(cache_dir, os.path.basename(csv_loader.rejected_path(csv_path)))) as f:
+        rejected = sum(1 for _ in f) - 1
+    print(f"Rejected rows written to the side file: {rejected:,} of {args.bad_rows:,} corrupted")
+
+    chunked = results['chunked']
+    budget = CHUNK_FACTOR * chunked['chunk_mb'] + chunked['frame_mb']
+    print(f"Peak {chunked['peak_mb']:.1f} MB, budget {budget:.1f} MB "
+          f"({CHUNK_FACTOR} x {chunked['chunk_mb']:.1f} MB chunk + {chunked['frame_mb']:.1f} MB result)")
+    if chunked['peak_mb'] > budget or rejected != args.bad_rows:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
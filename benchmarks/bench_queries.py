@@ -0,0 +1,67 @@
+# Aggregate queries through the repository API: pandas (in memory) vs DuckDB (database file)
+#
+#   python -m benchmarks.bench_queries [--rows 5000000] [--data-dir /tmp/mtid-bench]
+import argparse
+import os
+import time
+
+# Typical page queries: (label, dims, keyword arguments)
+QUERIES = [
+    ('partners, top 10', ['Partner_Country'], {'trade_type': 'Formal', 'order_by': 'Trade_Value_USD', 'limit': 10}),
+    ('HS code x transport', ['HS_Code', 'Mode_of_Transport'], {'trade_type': 'Formal'}),
+    ('office x month, 2024', ['Customs_Office', 'Month'], {'trade_type': 'Informal', 'Year': 2024}),
+    ('partner x HS4 x flow', ['Partner_Country', 'HS4', 'Flow'], {}),
+    ('yearly totals (cube)', ['Year'], {'trade_type': 'Formal'}),
+]
+
+
+def timed(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Repository query benchmark")
+    parser.add_argument('--rows', type=int, default=5_000_000)
+    parser.add_argument('--data-dir', default='/tmp/mtid-bench')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    data_dir = os.path.join(args.data_dir, str(args.rows))
+    os.environ['MTID_DATA_DIR'] = data_dir
+    os.environ['MTID_DATA_CACHE_DIR'] = os.path.join(data_dir, '.cache')
+
+    import data_loader
+    import repository
+    from benchmarks.synthetic import write_trade_csvs
+    from dataset import TradeDataset
+
+    if not os.path.exists(os.path.join(data_dir, 'formal_trade.csv')):
+        print(f"Generating {args.rows:,} synthetic rows in {data_dir}")
+        write_trade_csvs(data_dir, args.rows)
+
+    version = data_loader.dataset_version()
+    dataset = TradeDataset(data_loader.load_dataset(), version=version)
+    start = time.perf_counter()
+    path = repository.build_database(version)
+    print(f"Database {path}: {os.path.getsize(path) / 1e6:.1f} MB, "
+          f"built in {time.perf_counter() - start:.2f} s (once per version)")
+
+    backends = {
+        'pandas': repository.PandasRepository(dataset),
+        'duckdb': repository.DuckDBRepository(path, dataset.cube),
+    }
+    print(f"{'query':>22} {'pandas ms':>10} {'duckdb ms':>10} {'groups':>7}")
+    for label, dims, kwargs in QUERIES:
+        row = []
+        for backend in backends.values():
+            backend.aggregate(dims, **kwargs)
+            ms, result = timed(lambda: backend.aggregate(dims, **kwargs), args.repeat)
+            row.append(ms)
+        print(f"{label:>22} {row[0]:>10.1f} {row[1]:>10.1f} {len(result):>7,}")
+
+
+if __name__ == '__main__':
+    main()
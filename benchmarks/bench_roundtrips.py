@@ -0,0 +1,63 @@
+# Server round-trips for a typical navigation session, from the app's callback graph
+#
+#   python -m benchmarks.bench_roundtrips
+#
+# Each user action changes one component property; every callback reachable from
+# it through the callback graph fires once. Clientside callbacks run in the
+# browser, every other callback is one POST to /_dash-update-component.
+# Callbacks whose outputs are not on the current page are counted as well, so
+# the server column is an upper bound.
+
+# Typical session: visit every page, switch trade type twice, go back to the overview
+SESSION = [
+    'nav-page2.n_clicks', 'nav-page3.n_clicks', 'nav-page4.n_clicks',
+    'btn-informal.n_clicks', 'nav-page5.n_clicks', 'nav-page6.n_clicks',
+    'nav-page7.n_clicks', 'btn-formal.n_clicks', 'nav-page1.n_clicks',
+]
+
+
+def split_outputs(output):
+    """'..a.b...c.d..' or 'a.b' -> ['a.b', 'c.d']"""
+    if output.startswith('..'):
+        return output[2:-2].split('...')
+    return [output]
+
+
+def fired_callbacks(dependencies, changed_prop):
+    """Callbacks triggered, directly or through other callbacks' outputs, by one property change"""
+    changed = {changed_prop}
+    fired = []
+    pending = True
+    while pending:
+        pending = False
+        for dependency in dependencies:
+            if dependency in fired:
+                continue
+            inputs = {f"{i['id']}.{i['property']}" for i in dependency['inputs']}
+            if inputs & changed:
+                fired.append(dependency)
+                changed.update(split_outputs(dependency['output']))
+                pending = True
+    return fired
+
+
+def main():
+    import app
+
+    client = app.app.server.test_client()
+    dependencies = client.get('/_dash-dependencies').get_json()
+
+    total_server = total_client = 0
+    print(f"{'action':>24} {'server':>7} {'client':>7}")
+    for action in SESSION:
+        fired = fired_callbacks(dependencies, action)
+        server = sum(1 for d in fired if not d.get('clientside_function'))
+        client_side = len(fired) - server
+        total_server += server
+        total_client += client_side
+        print(f"{action:>24} {server:>7} {client_side:>7}")
+    print(f"{'total':>24} {total_server:>7} {total_client:>7}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+# Worker startup time and memory: plain CSV parsing vs the columnar cache
+#
+#   python -m benchmarks.bench_startup [--rows 5000000] [--data-dir /tmp/mtid-bench]
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+
+from benchmarks.synthetic import write_trade_csvs
+
+# Each mode runs in a fresh interpreter, like a newly forked worker
+LOADERS = {
+    'csv': """
+import pandas as pd
+df_formal = pd.read_csv(os.path.join(data_dir, 'formal_trade.csv'))
+df_informal = pd.read_csv(os.path.join(data_dir, 'informal_trade.csv'))
+df_formal['Trade_Type'] = 'Formal'
+df_informal['Trade_Type'] = 'Informal'
+df = pd.concat([df_formal, df_informal], ignore_index=True)
+""",
+    'cache': """
+import data_loader
+df = data_loader.load_trade_data()
+""",
+}
+
+CHILD = """
+def peak_rss_mb():
+    # VmHWM is reset on exec, unlike ru_maxrss which inherits the parent's peak
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmHWM:'):
+                return int(line.split()[1]) / 1024
+
+import json, os, sys, time
+data_dir = sys.argv[1]
+start = time.perf_counter()
+{loader}
+elapsed = time.perf_counter() - start
+print(json.dumps({{
+    'rows': len(df),
+    'seconds': elapsed,
+    'frame_mb': df.memory_usage(deep=True).sum() / 1e6,
+    'peak_rss_mb': peak_rss_mb(),
+}}))
+"""
+
+
+def run_loader(mode, data_dir):
+    env = dict(os.environ, MTID_DATA_DIR=data_dir)
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    out = subprocess.run(
+        [sys.executable, '-c', CHILD.format(loader=LOADERS[mode]), data_dir],
+        cwd=root, env=env, check=True, capture_output=True, text=True
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Startup time and memory benchmark")
+    parser.add_argument('--rows', type=int, default=5_000_000)
+    parser.add_argument('--data-dir', default='/tmp/mtid-bench')
+    args = parser.parse_args()
+
+    data_dir = os.path.join(args.data_dir, str(args.rows))
+    if not os.path.exists(os.path.join(data_dir, 'formal_trade.csv')):
+        print(f"Generating {args.rows:,} synthetic rows in {data_dir}")
+        write_trade_csvs(data_dir, args.rows)
+
+    # Start from a cold cache so the first 'cache' run includes the conversion
+    shutil.rmtree(os.path.join(data_dir, '.cache'), ignore_errors=True)
+
+    print(f"{'mode':>14} {'seconds':>9} {'frame MB':>10} {'peak RSS MB':>12}")
+    for label, mode in (('csv', 'csv'), ('cache (build)', 'cache'), ('cache (warm)', 'cache')):
+        result = run_loader(mode, data_dir)
+        print(f"{label:>14} {result['seconds']:>9.2f} {result['frame_mb']:>10.1f} {result['peak_rss_mb']:>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+# Response size and build time of the Page 7 table data + tooltips, before and after
+#
+#   python -m benchmarks.bench_tooltips [--sizes 10000 100000 1000000]
+import argparse
+import time
+
+from plotly.io.json import to_json_plotly
+
+import config
+import raw_table
+from benchmarks.synthetic import make_trade_frame
+
+
+def build_before(display_df):
+    """All rows and a tooltip for every cell, as update_raw_dataset used to do"""
+    data = display_df.to_dict('records')
+    tooltip_data = [
+        {
+            column: {'value': str(value), 'type': 'markdown'}
+            for column, value in row.items()
+        } for row in display_df.to_dict('records')
+    ]
+    return data, tooltip_data
+
+
+def build_after(display_df):
+    """One page of rows with tooltips for the long text columns only"""
+    page_df, _ = raw_table.query_page(
+        ('bench', id(display_df)), display_df, 0, config.RAW_TABLE_PAGE_SIZE, [], ''
+    )
+    tooltip_data = raw_table.page_tooltips(
+        page_df, config.RAW_TABLE_TOOLTIP_COLUMNS, config.RAW_TABLE_TOOLTIP_MIN_LENGTH
+    )
+    return page_df.to_dict('records'), tooltip_data
+
+
+def measure(build, display_df):
+    """Return (response bytes, build seconds, serialization seconds)"""
+    start = time.perf_counter()
+    data, tooltip_data = build(display_df)
+    built = time.perf_counter()
+    payload = to_json_plotly({'data': data, 'tooltip_data': tooltip_data})
+    done = time.perf_counter()
+    return len(payload.encode('utf-8')), built - start, done - built
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Page 7 tooltip payload benchmark")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'variant':>8} {'bytes':>14} {'build s':>9} {'json s':>9}")
+    for n_rows in args.sizes:
+        display_df = make_trade_frame(n_rows)
+        for name, build in (('before', build_before), ('after', build_after)):
+            size, build_s, json_s = measure(build, display_df)
+            print(f"{n_rows:>10,} {name:>8} {size:>14,} {build_s:>9.3f} {json_s:>9.3f}")
+
+
+if __name__ == '__main__':
+    main()
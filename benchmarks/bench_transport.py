@@ -0,0 +1,110 @@
+# Callback payload size and serialization time: records vs columnar/typed arrays, json vs orjson, compression
+#
+#   python -m benchmarks.bench_transport [--rows 1000000]
+#
+# Page 7 payloads are built the way update_raw_table_page builds them. The
+# figures stand in for the chart-heavy pages (partners, trends, products, unit
+# values), with their arrays as base64 typed arrays (plotly >= 6) and as
+# plain lists (plotly 5).
+import argparse
+import base64
+import gzip
+import time
+
+import numpy as np
+import plotly.express as px
+from plotly.io.json import to_json_plotly
+
+import transport
+from benchmarks.bench_alerts import make_dataset
+
+PAGE_SIZES = [20, 100, 1000]
+
+
+def as_lists(value):
+    """Figure dict with every typed array decoded back into a list"""
+    if isinstance(value, dict):
+        if 'bdata' in value and 'dtype' in value:
+            return np.frombuffer(base64.b64decode(value['bdata']), dtype=value['dtype']).tolist()
+        return {key: as_lists(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [as_lists(item) for item in value]
+    return value
+
+
+def figures(frame):
+    """Typical chart payloads, as (name, figure with typed arrays, figure with lists)"""
+    partners = frame.groupby(['Partner_Country', 'Flow'], observed=True)['Trade_Value_USD'].sum().reset_index()
+    monthly = frame.groupby(['Year', 'Month', 'Flow'], observed=True)['Trade_Value_USD'].sum().reset_index()
+    products = frame.groupby(['HS2', 'HS4', 'HS_Code'], observed=True)['Trade_Value_USD'].sum().reset_index()
+    sample = frame.sample(min(len(frame), 20_000), random_state=0)
+    unit_values = sample.assign(Unit_Value=sample['Trade_Value_USD'] / sample['Quantity'])
+    built = {
+        'partners (bar)': px.bar(partners, x='Partner_Country', y='Trade_Value_USD', color='Flow'),
+        'trend (line)': px.line(monthly, x='Month', y='Trade_Value_USD', color='Flow', line_group='Year'),
+        'products (treemap)': px.treemap(products, path=['HS2', 'HS4', 'HS_Code'], values='Trade_Value_USD'),
+        'unit values (scatter)': px.scatter(unit_values, x='Quantity', y='Unit_Value', color='Flow'),
+    }
+    return [(name, figure.to_dict(), as_lists(figure.to_dict())) for name, figure in built.items()]
+
+
+def measure(payload, repeat):
+    """(json bytes, json ms, orjson ms, gzip bytes, brotli bytes or None, gzip ms)"""
+    timings = {}
+    for engine in ('json', 'orjson'):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            text = to_json_plotly(payload, engine=engine)
+        timings[engine] = (time.perf_counter() - start) / repeat * 1000
+    data = text.encode()
+
+    start = time.perf_counter()
+    gzipped = gzip.compress(data, 6)
+    gzip_ms = (time.perf_counter() - start) * 1000
+    try:
+        import brotli
+        brotli_bytes = len(brotli.compress(data, quality=4))
+    except ImportError:
+        brotli_bytes = None
+    return len(data), timings['json'], timings['orjson'], len(gzipped), brotli_bytes, gzip_ms
+
+
+def print_row(label, result):
+    size, json_ms, orjson_ms, gzip_bytes, brotli_bytes, gzip_ms = result
+    brotli_text = f"{brotli_bytes:>10,}" if brotli_bytes is not None else f"{'n/a':>10}"
+    print(f"{label:>34} {size:>10,} {json_ms:>8.2f} {orjson_ms:>8.2f} {gzip_bytes:>10,} {brotli_text} {gzip_ms:>7.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Callback payload benchmark")
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    dataset = make_dataset(args.rows)
+    frame = dataset.partition('Formal')
+    header = f"{'payload':>34} {'bytes':>10} {'json ms':>8} {'orjson':>8} {'gzip':>10} {'brotli':>10} {'gzip ms':>7}"
+
+    print("Page 7 table page")
+    print(header)
+    for page_size in PAGE_SIZES:
+        page = frame.iloc[:page_size][dataset.columns]
+        transport.config.TABLE_TYPED_ARRAYS = False
+        plain = transport.columnar(page)
+        transport.config.TABLE_TYPED_ARRAYS = True
+        for label, payload in (
+            ('records', page.to_dict('records')),
+            ('columnar', plain),
+            ('columnar + typed arrays', transport.columnar(page)),
+        ):
+            print_row(f"{page_size} rows, {label}", measure(payload, args.repeat))
+
+    print("\nChart figures")
+    print(header)
+    for name, typed, lists in figures(frame):
+        print_row(f"{name}, lists", measure(lists, args.repeat))
+        print_row(f"{name}, typed arrays", measure(typed, args.repeat))
+
+
+if __name__ == '__main__':
+    main()
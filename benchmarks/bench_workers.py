@@ -0,0 +1,83 @@
+# Per-worker memory with N workers alive at once: private copies vs the shared Arrow file
+#
+#   python -m benchmarks.bench_workers [--rows 1000000] [--workers 4]
+#
+# The workers are plain interpreters that load the dataset the way a gunicorn
+# worker does; gunicorn itself is not started.
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+from benchmarks.synthetic import write_trade_csvs
+
+CHILD = """
+import json, sys
+import data_loader
+df = data_loader.load_dataset()
+# Touch every numeric column, as the page callbacks would
+df.select_dtypes('number').sum()
+print('ready', flush=True)
+sys.stdin.readline()
+memory = {}
+with open('/proc/self/smaps_rollup') as f:
+    for line in f:
+        name, value = line.split(':', 1)
+        if name in ('Rss', 'Pss'):
+            memory[name] = int(value.split()[0]) / 1024
+print(json.dumps(memory), flush=True)
+"""
+
+
+def measure(mode, data_dir, n_workers):
+    """Average RSS and PSS (MB) over n_workers processes that hold the dataset together"""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, MTID_DATA_DIR=data_dir, MTID_DATA_MODE=mode)
+
+    # Build caches up front, like the gunicorn on_starting hook does
+    subprocess.run([sys.executable, '-c', 'import data_loader; data_loader.load_dataset()'],
+                   cwd=root, env=env, check=True)
+
+    workers = [
+        subprocess.Popen([sys.executable, '-c', CHILD], cwd=root, env=env,
+                         stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+        for _ in range(n_workers)
+    ]
+    for worker in workers:
+        assert worker.stdout.readline().strip() == 'ready'
+    results = []
+    for worker in workers:
+        worker.stdin.write('\n')
+        worker.stdin.flush()
+        results.append(json.loads(worker.stdout.readline()))
+    for worker in workers:
+        worker.stdin.close()
+        worker.wait()
+
+    return (
+        sum(r['Rss'] for r in results) / n_workers,
+        sum(r['Pss'] for r in results) / n_workers,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-worker memory benchmark")
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--data-dir', default='/tmp/mtid-bench')
+    args = parser.parse_args()
+
+    data_dir = os.path.join(args.data_dir, str(args.rows))
+    if not os.path.exists(os.path.join(data_dir, 'formal_trade.csv')):
+        write_trade_csvs(data_dir, args.rows)
+
+    print(f"{args.workers} workers, {args.rows:,} rows")
+    print(f"{'mode':>8} {'RSS MB':>10} {'PSS MB':>10}")
+    for mode in ('cache', 'shared'):
+        rss, pss = measure(mode, data_dir, args.workers)
+        print(f"{mode:>8} {rss:>10.1f} {pss:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
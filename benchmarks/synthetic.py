@@ -0,0 +1,76 @@
+# Synthetic formal/informal trade data matching the Page 7 data dictionary
+import os
+
+import numpy as np
+import pandas as pd
+
+MONTHS = ['January', 'February', 'March', 'April', 'May', 'June',
+          'July', 'August', 'September', 'October', 'November', 'December']
+
+# (HS2, HS4, HS_Code, HS_Description, Unit)
+PRODUCTS = [
+    ('09', '0901', '090111', 'Coffee, not roasted, not decaffeinated', 'Kg'),
+    ('09', '0902', '090240', 'Black tea (fermented) and partly fermented tea', 'Kg'),
+    ('26', '2609', '260900', 'Tin ores and concentrates', 'Kg'),
+    ('26', '2615', '261590', 'Niobium, tantalum or vanadium ores and concentrates', 'Kg'),
+    ('27', '2710', '271019', 'Petroleum oils and oils obtained from bituminous minerals', 'Litres'),
+    ('71', '7108', '710812', 'Gold in unwrought forms, non-monetary', 'Kg'),
+    ('84', '8471', '847130', 'Portable automatic data processing machines', 'Units'),
+    ('85', '8517', '851712', 'Telephones for cellular networks', 'Units'),
+    ('10', '1006', '100630', 'Semi-milled or wholly milled rice', 'Tonnes'),
+    ('07', '0701', '070190', 'Potatoes, fresh or chilled', 'Tonnes'),
+]
+
+# (Partner_Country, Region)
+PARTNERS = [
+    ('Uganda', 'EAC'), ('Kenya', 'EAC'), ('Tanzania', 'EAC'), ('Burundi', 'EAC'),
+    ('DR Congo', 'EAC'), ('China', 'Asia'), ('India', 'Asia'),
+    ('United Arab Emirates', 'Middle East'), ('Belgium', 'Europe'), ('United States', 'Americas'),
+]
+
+TRANSPORT = ['Road', 'Air', 'Sea', 'Rail']
+CUSTOMS_OFFICES = ['Gatuna', 'Rusumo', 'Kigali Airport', 'Rubavu', 'Rusizi', 'Kigali Inland Port']
+
+
+def make_trade_frame(n_rows, seed=0, years=(2023, 2024, 2025)):
+    """Random transactions with the same columns and value ranges as the real extracts"""
+    rng = np.random.default_rng(seed)
+
+    products = rng.integers(0, len(PRODUCTS), n_rows)
+    partners = rng.integers(0, len(PARTNERS), n_rows)
+    months = rng.integers(0, 12, n_rows)
+    quantity = rng.integers(1, 50_000, n_rows)
+    unit_value = rng.lognormal(mean=1.5, sigma=0.6, size=n_rows)
+
+    def pick(table, index, field):
+        return np.array([row[field] for row in table], dtype=object)[index]
+
+    return pd.DataFrame({
+        'Year': rng.choice(list(years), n_rows),
+        'Quarter': np.array(['Q1', 'Q2', 'Q3', 'Q4'], dtype=object)[months // 3],
+        'Month': np.array(MONTHS, dtype=object)[months],
+        'Flow': rng.choice(np.array(['Export', 'Import'], dtype=object), n_rows),
+        'HS2': pick(PRODUCTS, products, 0),
+        'HS4': pick(PRODUCTS, products, 1),
+        'HS_Code': pick(PRODUCTS, products, 2),
+        'HS_Description': pick(PRODUCTS, products, 3),
+        'Partner_Country': pick(PARTNERS, partners, 0),
+        'Region': pick(PARTNERS, partners, 1),
+        'Trade_Value_USD': (quantity * unit_value).round(2),
+        'Quantity': quantity,
+        'Unit': pick(PRODUCTS, products, 4),
+        'Mode_of_Transport': rng.choice(np.array(TRANSPORT, dtype=object), n_rows),
+        'Customs_Office': rng.choice(np.array(CUSTOMS_OFFICES, dtype=object), n_rows),
+    })
+
+
+def write_trade_csvs(directory, n_rows, informal_share=0.25, seed=0):
+    """Write formal_trade.csv and informal_trade.csv with n_rows transactions in total"""
+    os.makedirs(directory, exist_ok=True)
+    n_informal = int(n_rows * informal_share)
+    make_trade_frame(n_rows - n_informal, seed=seed).to_csv(
+        os.path.join(directory, 'formal_trade.csv'), index=False
+    )
+    make_trade_frame(n_informal, seed=seed + 1).to_csv(
+        os.path.join(directory, 'informal_trade.csv'), index=False
+    )
@@ -0,0 +1,163 @@
+# Memoization of page layouts and callback outputs
+#
+# Results are keyed on the callback name, its input values and the dataset
+# version, so a data reload never serves stale output. The 'memory' backend
+# is a per-worker LRU; the 'filesystem' backend stores pickles in a directory
+# every gunicorn worker on the box can see.
+import functools
+import hashlib
+import json
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+import config
+
+_MISSING = object()
+
+
+def make_key(*parts):
+    """Stable digest of JSON-like key parts (page id, trade type, inputs, version)"""
+    text = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class MemoryBackend:
+    """Bounded LRU with optional TTL, local to one worker"""
+
+    def __init__(self, max_entries, ttl=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return _MISSING
+            stored_at, value = entry
+            if self.ttl and time.time() - stored_at > self.ttl:
+                del self._entries[key]
+                return _MISSING
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.time(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class FilesystemBackend:
+    """Pickles in a shared directory; file mtime is used for TTL and LRU order"""
+
+    def __init__(self, directory, max_entries, ttl=None):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.ttl = ttl
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.pkl')
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            if self.ttl and time.time() - os.path.getmtime(path) > self.ttl:
+                self._remove(path)
+                return _MISSING
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+            os.utime(path)
+            return value
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return _MISSING
+
+    def set(self, key, value):
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        self._evict()
+
+    @staticmethod
+    def _remove(path):
+        # Other workers share the directory and may have removed the file already
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _entries(self):
+        """(mtime, path) of the cached files"""
+        entries = []
+        try:
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith('.pkl'):
+                    try:
+                        entries.append((entry.stat().st_mtime, entry.path))
+                    except OSError:
+                        pass
+        except OSError:
+            pass
+        return entries
+
+    def _evict(self):
+        entries = self._entries()
+        if len(entries) <= self.max_entries:
+            return
+        entries.sort()
+        for _, path in entries[:len(entries) - self.max_entries]:
+            self._remove(path)
+
+    def clear(self):
+        for _, path in self._entries():
+            self._remove(path)
+
+
+class CallbackCache:
+    """Cache for callback results keyed on (name, inputs, dataset version)"""
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def get_or_set(self, key, build):
+        value = self.backend.get(key)
+        if value is _MISSING:
+            value = build()
+            self.backend.set(key, value)
+        return value
+
+    def memoize(self, version):
+        """Decorator; `version` is called on every lookup and returns the dataset version"""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args):
+                key = make_key(func.__qualname__, args, version())
+                return self.get_or_set(key, lambda: func(*args))
+            return wrapper
+        return decorator
+
+    def clear(self):
+        self.backend.clear()
+
+
+def create_cache():
+    """Callback cache for the configured backend"""
+    if not config.CACHE_ENABLED:
+        return CallbackCache(MemoryBackend(max_entries=0))
+    if config.CACHE_BACKEND == 'filesystem':
+        backend = FilesystemBackend(config.CACHE_DIR, config.CACHE_MAX_ENTRIES, config.CACHE_TTL)
+    else:
+        backend = MemoryBackend(config.CACHE_MAX_ENTRIES, config.CACHE_TTL)
+    return CallbackCache(backend)
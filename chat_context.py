@@ -0,0 +1,243 @@
+# Precomputed data summaries for the AI chat assistant
+#
+# Once per dataset version, the repository API is asked for a fixed set of
+# aggregates per trade type: top partners and products, the balance by quarter,
+# and the transport mode and customs office mix. These are written out as short
+# fact lines. Partners, regions, products, customs offices and transport modes
+# also get their own facts, under a lookup of their lower-cased names.
+#
+# A chat turn then only matches entity names in the question, with one
+# precompiled regex, and joins the precomputed lines up to a character budget
+# sized for the model's context window. No rows are scanned or serialized per
+# message.
+import re
+import threading
+from collections import OrderedDict
+
+import config
+import data_loader
+import repository
+
+# Entries in each "top" list
+TOP_N = 5
+
+# Related items (main products of a partner, main partners of a product, ...)
+RELATED_N = 3
+
+# Quarters shown in the balance overview
+BALANCE_PERIODS = 8
+
+# Columns whose values can be named in a question, and how facts refer to them
+ENTITY_COLUMNS = {
+    'Partner_Country': 'partner',
+    'Region': 'region',
+    'HS_Description': 'product',
+    'Customs_Office': 'customs office',
+    'Mode_of_Transport': 'transport mode',
+}
+
+# Indexes kept per dataset version, like the open repositories
+OPEN_VERSIONS = 2
+
+# Extra names of a product (its HS code, the head of its description) are only
+# looked up when they say something on their own: 'Other' from 'Other, of iron
+# or steel' would match most questions
+MIN_ALIAS_LENGTH = 4
+ALIAS_STOP_WORDS = {
+    'other', 'others', 'parts', 'articles', 'products', 'goods', 'machines',
+    'waste', 'scrap', 'mixtures', 'preparations', 'similar', 'nesoi', 'n.e.s.',
+}
+
+
+def format_usd(value):
+    """Compact dollar amount, e.g. $12.35M or -$4.00K"""
+    sign = '-' if value < 0 else ''
+    for suffix, scale in (('B', 1e9), ('M', 1e6), ('K', 1e3)):
+        if abs(value) >= scale:
+            return f"{sign}${abs(value) / scale:,.2f}{suffix}"
+    return f"{sign}${abs(value):,.0f}"
+
+
+def _hs(code, width):
+    """HS code with its leading zeros, whether stored as a number or a string"""
+    return str(code).zfill(width)
+
+
+def _by_flow(frame, keys):
+    """Export, Import, Total and Balance columns per key"""
+    flows = frame.pivot_table(
+        index=keys, columns='Flow', values='Trade_Value_USD', aggfunc='sum', fill_value=0, observed=True
+    )
+    flows = flows.reindex(columns=['Export', 'Import'], fill_value=0)
+    flows['Total'] = flows['Export'] + flows['Import']
+    flows['Balance'] = flows['Export'] - flows['Import']
+    return flows.sort_values('Total', ascending=False, kind='stable')
+
+
+def _top(frame, key, related, n=RELATED_N):
+    """The n largest `related` values per `key`, as {key: 'a ($x), b ($y)'}"""
+    frame = frame.sort_values('Trade_Value_USD', ascending=False, kind='stable')
+    frame = frame.groupby(key, observed=True, sort=False).head(n)
+    text = frame[related].astype(str) + ' (' + frame['Trade_Value_USD'].map(format_usd) + ')'
+    return text.groupby(frame[key].to_numpy(), sort=False).agg(', '.join).to_dict()
+
+
+def _listing(flows, column='Total', n=TOP_N):
+    top = flows[column].sort_values(ascending=False, kind='stable').head(n)
+    return ', '.join(f"{name} ({format_usd(value)})" for name, value in top.items() if value > 0)
+
+
+class SummaryIndex:
+    """Fact lines per trade type and entity, with a name lookup, for one dataset version"""
+
+    def __init__(self, queries, trade_types):
+        self.overview = {}
+        self.facts = {}
+        names = {}
+        for trade_type in trade_types:
+            self._summarize(queries, trade_type, names)
+
+        self.names = names
+        # Longest names first, so 'Democratic Republic of the Congo' wins over 'Congo'.
+        # Lookarounds instead of \b, which needs a word character at both ends of
+        # the name and so never matches 'Korea, Rep.' or 'Congo (DRC)'.
+        alternatives = sorted(names, key=len, reverse=True)
+        self._pattern = re.compile(
+            r'(?<!\w)(' + '|'.join(map(re.escape, alternatives)) + r')(?!\w)' if alternatives else r'(?!)'
+        )
+
+    def _summarize(self, queries, trade_type, names):
+        value = ['Trade_Value_USD']
+        totals = queries.aggregate(['Flow'], value, trade_type).set_index('Flow')['Trade_Value_USD']
+        exports, imports = totals.get('Export', 0.0), totals.get('Import', 0.0)
+        total = exports + imports
+        years = queries.values('Year', trade_type=trade_type)
+        records = queries.total('Records', trade_type=trade_type)
+
+        partners = _by_flow(queries.aggregate(['Partner_Country', 'Flow'], value, trade_type), 'Partner_Country')
+        hs2 = queries.aggregate(['HS2'], value, trade_type).set_index('HS2')['Trade_Value_USD']
+        hs2.index = hs2.index.map(lambda code: _hs(code, 2))
+        hs4 = queries.aggregate(['HS4'], value, trade_type).set_index('HS4')['Trade_Value_USD']
+        hs4.index = hs4.index.map(lambda code: _hs(code, 4))
+        periods = _by_flow(queries.aggregate(['Year', 'Quarter', 'Flow'], value, trade_type), ['Year', 'Quarter'])
+        periods = periods.sort_index().tail(BALANCE_PERIODS)
+        modes = _by_flow(queries.aggregate(['Mode_of_Transport', 'Flow'], value, trade_type), 'Mode_of_Transport')
+        offices = _by_flow(queries.aggregate(['Customs_Office', 'Flow'], value, trade_type), 'Customs_Office')
+        regions = _by_flow(queries.aggregate(['Region', 'Flow'], value, trade_type), 'Region')
+        products = _by_flow(
+            queries.aggregate(['HS_Description', 'HS_Code', 'Flow'], value, trade_type), ['HS_Description', 'HS_Code']
+        )
+
+        def share(amount):
+            return f"{amount / total:.1%}" if total else "n/a"
+
+        self.overview[trade_type] = [
+            f"{trade_type} trade {years[0]}-{years[-1]}: exports {format_usd(exports)}, "
+            f"imports {format_usd(imports)}, balance {format_usd(exports - imports)}, {records:,} records."
+            if years else f"{trade_type} trade: no records.",
+            f"{trade_type} top export partners: {_listing(partners, 'Export')}.",
+            f"{trade_type} top import partners: {_listing(partners, 'Import')}.",
+            f"{trade_type} top HS2 chapters: {_listing(hs2.to_frame('Total'))}.",
+            f"{trade_type} top HS4 headings: {_listing(hs4.to_frame('Total'))}.",
+            f"{trade_type} balance by quarter: " + ', '.join(
+                f"{year} {quarter} {format_usd(balance)}" for (year, quarter), balance in periods['Balance'].items()
+            ) + '.',
+            f"{trade_type} transport modes: " + ', '.join(
+                f"{mode} {share(amount)}" for mode, amount in modes['Total'].items()
+            ) + '.',
+            f"{trade_type} top customs offices: {_listing(offices)}.",
+        ]
+
+        partner_hs2 = queries.aggregate(['Partner_Country', 'HS2'], value, trade_type)
+        partner_hs2['HS2'] = partner_hs2['HS2'].map(lambda code: _hs(code, 2))
+        partner_products = _top(partner_hs2, 'Partner_Country', 'HS2')
+        product_partners = _top(
+            queries.aggregate(['HS_Description', 'Partner_Country'], value, trade_type), 'HS_Description', 'Partner_Country'
+        )
+        office_modes = _top(
+            queries.aggregate(['Customs_Office', 'Mode_of_Transport'], value, trade_type), 'Customs_Office', 'Mode_of_Transport'
+        )
+        region_partners = _top(queries.aggregate(['Region', 'Partner_Country'], value, trade_type), 'Region', 'Partner_Country')
+
+        def add_facts(column, flows, related=None, related_label=None):
+            for rank, (name, row) in enumerate(flows.iterrows(), 1):
+                label, aliases = name, []
+                if isinstance(name, tuple):
+                    # Products are also found by their HS code and the head of their description
+                    name, code = name
+                    label = f"{name} (HS {_hs(code, 6)})"
+                    aliases = [
+                        alias for alias in (_hs(code, 6), re.split(r'[,(]', name)[0].strip())
+                        if len(alias) >= MIN_ALIAS_LENGTH and alias.lower() not in ALIAS_STOP_WORDS
+                    ]
+                line = (
+                    f"{label} ({ENTITY_COLUMNS[column]}, {trade_type} trade): exports {format_usd(row['Export'])}, "
+                    f"imports {format_usd(row['Import'])}, balance {format_usd(row['Balance'])}, "
+                    f"{share(row['Total'])} of {trade_type} trade, rank {rank} of {len(flows)}"
+                )
+                if related is not None:
+                    line += f"; {related_label}: {related.get(name, 'none')}"
+                key = (column, name)
+                for alias in [name] + aliases:
+                    names.setdefault(str(alias).lower(), key)
+                self.facts.setdefault((trade_type, key), []).append(line + '.')
+
+        add_facts('Partner_Country', partners, partner_products, 'main HS2 chapters')
+        add_facts('Region', regions, region_partners, 'main partners')
+        add_facts('HS_Description', products, product_partners, 'main partners')
+        add_facts('Customs_Office', offices, office_modes, 'transport modes')
+        add_facts('Mode_of_Transport', modes)
+
+    def lookup(self, text):
+        """Entities named in text, as (column, value), in order of first mention"""
+        found = OrderedDict()
+        for match in self._pattern.finditer(text.lower()):
+            found.setdefault(self.names[match.group(1)], None)
+        return list(found)
+
+    def context(self, question, trade_type, max_chars=None):
+        """Facts for a chat turn: the entities named in the question first, then the overview"""
+        max_chars = max_chars or config.CHAT_CONTEXT_CHARS
+        lines = []
+        for key in self.lookup(question):
+            lines.extend(self.facts.get((trade_type, key), []))
+        lines.extend(self.overview.get(trade_type, []))
+
+        context, used = [], 0
+        for line in lines:
+            if used + len(line) + 1 > max_chars:
+                break
+            context.append(line)
+            used += len(line) + 1
+        return '\n'.join(context)
+
+
+_indexes = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def summary_index(dataset):
+    """SummaryIndex of one dataset version, built on first use"""
+    with _indexes_lock:
+        index = _indexes.get(dataset.version)
+        if index is None:
+            index = SummaryIndex(repository.open_repository(dataset), list(data_loader.SOURCES))
+            _indexes[dataset.version] = index
+            while len(_indexes) > OPEN_VERSIONS:
+                _indexes.popitem(last=False)
+        return index
+
+
+_store = None
+
+
+def bind(store):
+    """Follow the store's versions; the index of a new version is built on the watcher thread"""
+    global _store
+    _store = store
+    store.on_swap(summary_index)
+
+
+def context_for(question, trade_type, max_chars=None):
+    """Facts of the current dataset version for one chat turn (call from the chat callback)"""
+    return summary_index(_store.current()).context(question, trade_type, max_chars)
@@ -0,0 +1,73 @@
+# Runtime settings for the dashboard, overridable through environment variables
+import os
+
+
+def env_bool(name, default):
+    """Read a yes/no setting from the environment"""
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def env_int(name, default):
+    """Read an integer setting from the environment"""
+    value = os.environ.get(name)
+    return int(value) if value not in (None, '') else default
+
+
+# Raw dataset viewer (Page 7)
+RAW_TABLE_PAGE_SIZE = env_int('MTID_RAW_TABLE_PAGE_SIZE', 20)
+
+# Tooltips are only built for the rows of the current page, for these columns
+RAW_TABLE_TOOLTIPS = env_bool('MTID_RAW_TABLE_TOOLTIPS', True)
+RAW_TABLE_TOOLTIP_COLUMNS = ['HS_Description', 'Partner_Country', 'Customs_Office']
+RAW_TABLE_TOOLTIP_MIN_LENGTH = env_int('MTID_RAW_TABLE_TOOLTIP_MIN_LENGTH', 20)
+
+# Tooltips are switched off entirely when a trade type has more rows than this
+RAW_TABLE_TOOLTIP_MAX_ROWS = env_int('MTID_RAW_TABLE_TOOLTIP_MAX_ROWS', 1_000_000)
+
+# Trade data location and the columnar cache built from it
+DATA_DIR = os.environ.get('MTID_DATA_DIR', 'data')
+DATA_CACHE_DIR = os.environ.get('MTID_DATA_CACHE_DIR', os.path.join(DATA_DIR, '.cache'))
+
+# Rows parsed per chunk when a CSV is (re)ingested; bounds the loader's peak memory
+LOAD_CHUNK_ROWS = env_int('MTID_LOAD_CHUNK_ROWS', 100_000)
+
+# 'cache': every worker loads its own copy from the Parquet cache
+# 'shared': workers memory-map one Arrow file built before fork (see gunicorn.conf.py)
+DATA_MODE = os.environ.get('MTID_DATA_MODE', 'cache')
+
+# Backend of the repository API (repository.py): 'pandas' in memory, or 'duckdb' from a database file
+# (needs the optional duckdb package, falls back to 'pandas' without it)
+QUERY_BACKEND = os.environ.get('MTID_QUERY_BACKEND', 'pandas')
+
+# Characters of precomputed data facts sent to the chat model per message (chat_context.py)
+CHAT_CONTEXT_CHARS = env_int('MTID_CHAT_CONTEXT_CHARS', 6000)
+
+# Page layout / callback output cache ('memory' per worker or 'filesystem' shared by workers)
+CACHE_ENABLED = env_bool('MTID_CACHE', True)
+CACHE_BACKEND = os.environ.get('MTID_CACHE_BACKEND', 'memory')
+CACHE_DIR = os.environ.get('MTID_CACHE_DIR', os.path.join(DATA_CACHE_DIR, 'callbacks'))
+CACHE_MAX_ENTRIES = env_int('MTID_CACHE_MAX_ENTRIES', 256)
+CACHE_TTL = env_int('MTID_CACHE_TTL', 0) or None
+
+# Background jobs for slow pages (needs dash[diskcache]); results are kept per dataset version
+JOBS_ENABLED = env_bool('MTID_JOBS', True)
+JOBS_DIR = os.environ.get('MTID_JOBS_DIR', os.path.join(DATA_CACHE_DIR, 'jobs'))
+JOB_TIMEOUT = env_int('MTID_JOB_TIMEOUT', 600)
+JOB_RESULT_TTL = env_int('MTID_JOB_RESULT_TTL', 24 * 3600)
+
+# Callback response transport (transport.py): brotli/gzip compression of responses above the
+# threshold (needs dash[compress]), and base64 typed arrays for numeric table columns (faster to
+# serialize, but a little larger than compressed text)
+TABLE_TYPED_ARRAYS = env_bool('MTID_TABLE_TYPED_ARRAYS', False)
+COMPRESS_ENABLED = env_bool('MTID_COMPRESS', True)
+COMPRESS_MIN_BYTES = env_int('MTID_COMPRESS_MIN_BYTES', 1024)
+
+# Callback instrumentation: /metrics endpoint, JSON log lines and ?profile=1 dumps
+METRICS_ENABLED = env_bool('MTID_METRICS', False)
+PROFILE_DIR = os.environ.get('MTID_PROFILE_DIR', 'profiles')
+
+# Seconds between checks of the source CSVs for new data (0 disables hot reload)
+RELOAD_INTERVAL = env_int('MTID_RELOAD_INTERVAL', 60)
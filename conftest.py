@@ -0,0 +1 @@
+# Makes pytest put the repository root on sys.path, so plain `pytest` finds the app modules
@@ -0,0 +1,214 @@
+# Chunked, schema-validated parsing of the trade CSVs
+#
+# A file is read LOAD_CHUNK_ROWS rows at a time as raw text, checked against
+# the declared schema (the Page 7 data dictionary) and converted to compact
+# dtypes before the next chunk is read: categoricals for repeated text and HS
+# codes, the smallest integer type for quantities. Peak memory is one raw chunk
+# plus the compact rows kept so far. Rows that fail validation and lines with
+# the wrong number of fields are written to '<name>.rejected.csv' next to the
+# cache, with the reason, instead of failing the load.
+import logging
+import os
+import re
+import warnings
+
+import numpy as np
+import pandas as pd
+from pandas.errors import ParserWarning
+
+import config
+
+logger = logging.getLogger(__name__)
+
+# Declared columns and how each is parsed
+SCHEMA = {
+    'Year': 'year',
+    'Quarter': 'category',
+    'Month': 'category',
+    'Flow': 'category',
+    'HS2': 'code',
+    'HS4': 'code',
+    'HS_Code': 'code',
+    'HS_Description': 'category',
+    'Partner_Country': 'category',
+    'Region': 'category',
+    'Trade_Value_USD': 'value',
+    'Quantity': 'quantity',
+    'Unit': 'category',
+    'Mode_of_Transport': 'category',
+    'Customs_Office': 'category',
+}
+
+# A row is rejected when one of these is empty
+REQUIRED = ['Year', 'Quarter', 'Flow', 'HS2', 'HS4', 'HS_Code', 'Trade_Value_USD']
+
+# HS codes are text (data dictionary); digits-only codes shorter than this lost
+# their leading zeros, e.g. to a spreadsheet, and are padded back
+CODE_WIDTHS = {'HS2': 2, 'HS4': 4, 'HS_Code': 6}
+
+# Closed vocabularies from the data dictionary
+ALLOWED_VALUES = {
+    'Quarter': {'Q1', 'Q2', 'Q3', 'Q4'},
+    'Flow': {'Export', 'Import'},
+}
+
+YEAR_RANGE = (1900, 2100)
+
+# Parser warning for a line with the wrong number of fields
+BAD_LINE = re.compile(r'Skipping line (\d+): (.*)')
+
+
+class SchemaError(ValueError):
+    """The file lacks some of the declared columns"""
+
+
+def rejected_path(csv_path):
+    """Side file collecting the rejected rows of one CSV"""
+    name = os.path.splitext(os.path.basename(csv_path))[0]
+    return os.path.join(config.DATA_CACHE_DIR, name + '.rejected.csv')
+
+
+def read_header(csv_path):
+    """Column names of a CSV, checked against the schema"""
+    header = pd.read_csv(csv_path, nrows=0).columns.str.strip()
+    missing = [col for col in SCHEMA if col not in header]
+    if missing:
+        raise SchemaError(f"{csv_path} is missing columns: {', '.join(missing)}")
+    return list(header)
+
+
+def _clean_category(raw):
+    """Text column as a categorical with surrounding whitespace stripped, blanks as missing"""
+    values = raw.astype('category')
+    categories = values.cat.categories
+    stripped = categories.str.strip()
+    if not stripped.equals(categories):
+        # Strip once per distinct value rather than once per row
+        values = values.map(dict(zip(categories, stripped.where(stripped != '')))).astype('category')
+    return values
+
+
+def _clean_code(raw, width):
+    """HS code column as a categorical of text codes, with lost leading zeros restored"""
+    values = _clean_category(raw)
+    categories = values.cat.categories
+    padded = categories.where(~categories.str.fullmatch(r'\d+'), categories.str.zfill(width))
+    if not padded.equals(categories):
+        values = values.map(dict(zip(categories, padded))).astype('category')
+    return values
+
+
+def _to_number(raw):
+    """Float column of a text column; unparsable values become NaN"""
+    try:
+        # Fast path for the usual clean chunk
+        return raw.astype('float64')
+    except ValueError:
+        return pd.to_numeric(raw, errors='coerce')
+
+
+def convert_chunk(chunk):
+    """Compact typed rows of one raw text chunk, and the reason each rejected row failed"""
+    bad = np.zeros(len(chunk), dtype=bool)
+    reasons = np.empty(len(chunk), dtype=object)
+
+    def reject(mask, reason):
+        mask = np.asarray(mask, dtype=bool) & ~bad
+        reasons[mask] = reason
+        bad[mask] = True
+
+    parsed = {}
+    for col, kind in SCHEMA.items():
+        if kind == 'category':
+            values = _clean_category(chunk[col])
+            missing = values.isna()
+            if col in ALLOWED_VALUES:
+                reject(~missing & ~values.isin(ALLOWED_VALUES[col]), f"{col} is not one of the allowed values")
+        elif kind == 'code':
+            values = _clean_code(chunk[col], CODE_WIDTHS[col])
+        else:
+            missing = chunk[col].isna()
+            values = _to_number(chunk[col])
+            reject(~missing & values.isna(), f"{col} is not a number")
+            if kind == 'year':
+                reject(values.notna() & ~values.between(*YEAR_RANGE), f"{col} is out of range")
+            elif kind == 'quantity':
+                reject(values < 0, f"{col} is negative")
+        if col in REQUIRED:
+            reject(values.isna(), f"{col} is missing")
+        parsed[col] = values
+
+    good = ~bad
+    columns = {}
+    for col, kind in SCHEMA.items():
+        values = parsed[col][good]
+        if kind in ('category', 'code'):
+            columns[col] = values.cat.remove_unused_categories()
+        elif kind == 'year':
+            columns[col] = values.astype('int16')
+        elif kind == 'value':
+            columns[col] = values.astype('float64')
+        else:
+            # Whole numbers shrink to the smallest integer type, anything else stays float
+            columns[col] = pd.to_numeric(values, downcast='integer')
+    return (
+        pd.DataFrame(columns).reset_index(drop=True),
+        pd.Series(reasons[bad], index=chunk.index[bad]),
+    )
+
+
+def empty_frame():
+    """Zero rows with the schema's dtypes"""
+    return convert_chunk(pd.DataFrame({col: pd.Series(dtype=object) for col in SCHEMA}))[0]
+
+
+def read_trade_chunks(csv_path, offset=0, chunk_rows=None):
+    """Compact frames of a CSV, or of the rows after byte `offset`, one per chunk of chunk_rows"""
+    header = read_header(csv_path)
+    frames = []
+    rejected = []
+
+    with open(csv_path, 'rb') as f, warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter('always', ParserWarning)
+        f.seek(offset)
+        reader = pd.read_csv(
+            f,
+            header=None if offset else 0,
+            names=header,
+            dtype=str,
+            keep_default_na=False,
+            na_values=[''],
+            on_bad_lines='warn',
+            chunksize=chunk_rows or config.LOAD_CHUNK_ROWS,
+        )
+        for chunk in reader:
+            frame, reasons = convert_chunk(chunk)
+            frames.append(frame)
+            if len(reasons):
+                rows = chunk.loc[reasons.index, list(SCHEMA)]
+                rejected.append(rows.assign(Reject_Reason=reasons.to_numpy()))
+            del chunk
+
+    # Lines with the wrong number of fields never reach a chunk, the parser warns instead
+    for message in caught:
+        for line, reason in BAD_LINE.findall(str(message.message)):
+            rejected.append(pd.DataFrame({'Line': [int(line)], 'Reject_Reason': [reason]}))
+
+    _write_rejected(csv_path, offset, rejected)
+    return frames or [empty_frame()]
+
+
+def _write_rejected(csv_path, offset, rejected):
+    """Replace the side file after a full parse, append to it after parsing a tail"""
+    path = rejected_path(csv_path)
+    if not offset and os.path.exists(path):
+        os.remove(path)
+    if not rejected:
+        return
+
+    rows = pd.concat(rejected, ignore_index=True)
+    rows.insert(0, 'Offset', offset)
+    rows = rows.reindex(columns=['Offset', 'Line', 'Reject_Reason'] + list(SCHEMA))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    rows.to_csv(path, mode='a', header=not os.path.exists(path), index=False)
+    logger.warning("Skipped %d bad rows of %s, see %s", len(rows), csv_path, path)
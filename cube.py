@@ -0,0 +1,86 @@
+# Pre-aggregated trade cube for dashboard KPIs and charts
+import numpy as np
+import pandas as pd
+
+import data_loader
+
+# Dimensions of the cube, each cell is one combination of these
+# (rows with a blank dimension, e.g. no Region, form cells of their own instead of being dropped)
+DIMENSIONS = [
+    'Trade_Type', 'Year', 'Quarter', 'Flow', 'Region',
+    'Partner_Country', 'HS2', 'Mode_of_Transport',
+]
+
+# Additive measures kept per cell
+MEASURES = ['Trade_Value_USD', 'Quantity', 'Records']
+
+
+class TradeCube:
+    """Sums of Trade_Value_USD and Quantity plus record counts over DIMENSIONS"""
+
+    def __init__(self, df=None, cells=None):
+        self.cells = self.aggregate(df) if cells is None else cells
+
+    @staticmethod
+    def aggregate(df):
+        """Cube cells for a frame of transactions"""
+        dims = [dim for dim in DIMENSIONS if dim in df.columns]
+        return (
+            df.groupby(dims, observed=True, sort=False, dropna=False)
+            .agg(
+                Trade_Value_USD=('Trade_Value_USD', 'sum'),
+                Quantity=('Quantity', 'sum'),
+                Records=('Trade_Value_USD', 'size'),
+            )
+            .reset_index()
+        )
+
+    def extended(self, new_rows):
+        """New cube with new_rows added, merging only their aggregates into the existing cells"""
+        cells = data_loader.concat_frames([self.cells, self.aggregate(new_rows)])
+        dims = [dim for dim in DIMENSIONS if dim in cells.columns]
+        cells = cells.groupby(dims, observed=True, sort=False, dropna=False)[MEASURES].sum().reset_index()
+        return TradeCube(cells=cells)
+
+    def _select(self, filters):
+        """Cells matching filters given as {dimension: value or list of values}"""
+        cells = self.cells
+        if not filters:
+            return cells
+        mask = np.ones(len(cells), dtype=bool)
+        for dim, value in filters.items():
+            if dim not in DIMENSIONS:
+                raise KeyError(f"{dim} is not a cube dimension")
+            values = value if isinstance(value, (list, tuple, set)) else [value]
+            mask &= cells[dim].isin(values).to_numpy()
+        return cells[mask]
+
+    def rollup(self, dims=(), measures=None, **filters):
+        """Measures summed up to the given dimensions, e.g. rollup(['Year'], Trade_Type='Formal')"""
+        dims = list(dims)
+        for dim in dims:
+            if dim not in DIMENSIONS:
+                raise KeyError(f"{dim} is not a cube dimension")
+        measures = list(measures or MEASURES)
+        cells = self._select(filters)
+
+        if not dims:
+            return pd.DataFrame({measure: [cells[measure].sum()] for measure in measures})
+
+        return (
+            cells.groupby(dims, observed=True, sort=True, dropna=False)[measures]
+            .sum()
+            .reset_index()
+        )
+
+    def total(self, measure='Trade_Value_USD', **filters):
+        """Single total of one measure"""
+        return self._select(filters)[measure].sum()
+
+    def values(self, dim, **filters):
+        """Sorted distinct values of one dimension among the matching cells"""
+        cells = self._select(filters)
+        return sorted(pd.unique(cells[dim].dropna().to_numpy()).tolist())
+
+    def __len__(self):
+        return len(self.cells)
@@ -0,0 +1,345 @@
+# Loading of the formal and informal trade extracts through a columnar cache
+#
+# Each CSV is parsed once, in chunks against the declared schema (csv_loader),
+# into Parquet files partitioned
+# by Year and Quarter (data/.cache/<name>/<Year>-<Quarter>/part-NNNNN.parquet).
+# A manifest records how many bytes of the CSV have been ingested and their
+# SHA-256. Later loads, e.g. every gunicorn worker boot, read the partitions
+# as long as the CSV is unchanged. When a CSV only grew by new periods, just
+# the appended bytes are parsed and written as new part files; the existing
+# partitions are never rewritten. A loaded frame records the cache build and
+# part files it was read from (cache_state), so a reload in any worker can read
+# just the parts it does not hold yet, whichever process ingested them.
+#
+# In the 'shared' data mode the combined frame is also written once as an
+# uncompressed Arrow IPC file that every worker memory-maps read-only, so the
+# OS page cache holds a single copy of the data for all gunicorn workers.
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import shutil
+import uuid
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+import config
+import csv_loader
+
+logger = logging.getLogger(__name__)
+
+# Source files per trade type
+SOURCES = {
+    'Formal': 'formal_trade.csv',
+    'Informal': 'informal_trade.csv',
+}
+
+# Bump when the parsing rules change so old caches are rebuilt
+CACHE_FORMAT = 5
+
+
+def file_hash(path, block_size=1 << 20):
+    """SHA-256 of a file, read in blocks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _cache_paths(csv_path):
+    """Partition directory, manifest and lock file for one CSV"""
+    name = os.path.splitext(os.path.basename(csv_path))[0]
+    return (
+        os.path.join(config.DATA_CACHE_DIR, name),
+        os.path.join(config.DATA_CACHE_DIR, name + '.json'),
+        os.path.join(config.DATA_CACHE_DIR, name + '.lock'),
+    )
+
+
+def _read_manifest(manifest_path):
+    try:
+        with open(manifest_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_atomic(path, write):
+    """Write through a temporary file so concurrent readers never see a partial file"""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def _write_manifest(manifest_path, manifest):
+    def write(path):
+        with open(path, 'w') as f:
+            json.dump(manifest, f, indent=2)
+    _write_atomic(manifest_path, write)
+
+
+def read_trade_csv(csv_path):
+    """Parse one trade extract against the declared schema, in bounded-memory chunks"""
+    return concat_frames(csv_loader.read_trade_chunks(csv_path))
+
+
+def _hash_with_prefix(path, prefix_size, block_size=1 << 20):
+    """SHA-256 of the whole file and of its first prefix_size bytes, in one pass"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        remaining = prefix_size
+        while remaining:
+            block = f.read(min(block_size, remaining))
+            if not block:
+                break
+            digest.update(block)
+            remaining -= len(block)
+        prefix_digest = digest.hexdigest()
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest(), prefix_digest
+
+
+def read_trade_csv_tail(csv_path, offset):
+    """Parse only the rows appended after byte `offset`, or None if offset is not a line start"""
+    with open(csv_path, 'rb') as f:
+        f.seek(offset - 1)
+        if f.read(1) != b'\n':
+            return None
+    return concat_frames(csv_loader.read_trade_chunks(csv_path, offset))
+
+
+def concat_frames(frames):
+    """Concatenate column by column, merging categoricals instead of falling back to object"""
+    frames = [frame for frame in frames if len(frame.columns)]
+    if not frames:
+        return pd.DataFrame()
+    columns = {}
+    for col in frames[0].columns:
+        parts = [frame[col] for frame in frames]
+        if all(isinstance(part.dtype, pd.CategoricalDtype) for part in parts):
+            columns[col] = union_categoricals(parts, sort_categories=True)
+        else:
+            columns[col] = pd.concat(parts, ignore_index=True)
+    return pd.DataFrame(columns)
+
+
+def _write_partitions(partition_dir, frame, manifest):
+    """Write rows as new part files, one per (Year, Quarter), and list them in the manifest"""
+    for (year, quarter), rows in frame.groupby(['Year', 'Quarter'], observed=True, sort=True, dropna=False):
+        part = os.path.join(f"{year}-{quarter}", f"part-{manifest['next_part']:05d}.parquet")
+        path = os.path.join(partition_dir, part)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        _write_atomic(path, lambda p: rows.to_parquet(p, index=False))
+        manifest['parts'].append(part)
+        manifest['next_part'] += 1
+
+
+def ingest_trade_file(csv_path):
+    """Bring the partitioned cache of one CSV up to date; returns (rows parsed now or None, rebuilt)"""
+    partition_dir, manifest_path, lock_path = _cache_paths(csv_path)
+    os.makedirs(config.DATA_CACHE_DIR, exist_ok=True)
+
+    # One process ingests at a time; the others then find the cache current
+    with open(lock_path, 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+
+        stat = os.stat(csv_path)
+        manifest = _read_manifest(manifest_path)
+        usable = manifest is not None and manifest.get('format') == CACHE_FORMAT
+        if usable and (manifest['mtime_ns'], manifest['size']) == (stat.st_mtime_ns, stat.st_size):
+            return None, False
+
+        digest = None
+        if usable and stat.st_size >= manifest['size']:
+            # If the bytes already ingested are unchanged, the file was only
+            # touched or had rows appended; parse just the appended part
+            digest, prefix_digest = _hash_with_prefix(csv_path, manifest['size'])
+            if prefix_digest == manifest.get('sha256'):
+                new_rows = None
+                if stat.st_size > manifest['size']:
+                    new_rows = read_trade_csv_tail(csv_path, manifest['size'])
+                if new_rows is not None or stat.st_size == manifest['size']:
+                    if new_rows is not None:
+                        logger.info("Ingesting %d appended rows of %s", len(new_rows), csv_path)
+                        _write_partitions(partition_dir, new_rows, manifest)
+                        manifest['rows'] += len(new_rows)
+                    manifest.update(mtime_ns=stat.st_mtime_ns, size=stat.st_size, sha256=digest)
+                    _write_manifest(manifest_path, manifest)
+                    return new_rows, False
+
+        logger.info("Building partitioned cache for %s", csv_path)
+        frame = read_trade_csv(csv_path)
+        if os.path.isdir(partition_dir):
+            shutil.rmtree(partition_dir)
+        manifest = {
+            'format': CACHE_FORMAT,
+            # New on every rebuild, when part names start over
+            'build': uuid.uuid4().hex,
+            'source': os.path.abspath(csv_path),
+            'mtime_ns': stat.st_mtime_ns,
+            'size': stat.st_size,
+            'sha256': digest or file_hash(csv_path),
+            'rows': len(frame),
+            'parts': [],
+            'next_part': 0,
+        }
+        _write_partitions(partition_dir, frame, manifest)
+        _write_manifest(manifest_path, manifest)
+        return frame, True
+
+
+def cache_state(csv_path):
+    """Build and part files of one CSV's partitioned cache, as {'build': ..., 'parts': [...]}"""
+    _, manifest_path, _ = _cache_paths(csv_path)
+    manifest = _read_manifest(manifest_path)
+    return {'build': manifest['build'], 'parts': list(manifest['parts'])}
+
+
+def read_partitions(csv_path, parts=None):
+    """Cached rows of one CSV, all or just the given part files, in (Year, Quarter, ingestion) order"""
+    partition_dir, manifest_path, _ = _cache_paths(csv_path)
+    if parts is None:
+        parts = _read_manifest(manifest_path)['parts']
+    frames = [pd.read_parquet(os.path.join(partition_dir, part)) for part in sorted(parts)]
+    if not frames:
+        return csv_loader.empty_frame()
+    return concat_frames(frames)
+
+
+def partition_files(csv_path):
+    """Paths of the Parquet files of one CSV's up-to-date partitioned cache"""
+    ingest_trade_file(csv_path)
+    partition_dir, manifest_path, _ = _cache_paths(csv_path)
+    manifest = _read_manifest(manifest_path)
+    return [os.path.join(partition_dir, part) for part in sorted(manifest['parts'])]
+
+
+def load_trade_file(csv_path):
+    """Load one trade extract through its partitioned cache"""
+    ingest_trade_file(csv_path)
+    return read_partitions(csv_path)
+
+
+def _with_trade_type(frame, trade_type):
+    frame['Trade_Type'] = pd.Categorical.from_codes(
+        np.full(len(frame), list(SOURCES).index(trade_type), dtype='int8'),
+        categories=list(SOURCES)
+    )
+    return frame
+
+
+def load_trade_sources():
+    """Combined frame with a Trade_Type column, and the cache state it was read from per trade type"""
+    frames, states = [], {}
+    for trade_type, file_name in SOURCES.items():
+        csv_path = os.path.join(config.DATA_DIR, file_name)
+        ingest_trade_file(csv_path)
+        states[trade_type] = cache_state(csv_path)
+        frames.append(_with_trade_type(read_partitions(csv_path, states[trade_type]['parts']), trade_type))
+    return concat_frames(frames), states
+
+
+def load_trade_data():
+    """Formal and informal trade combined into one frame with a Trade_Type column"""
+    return load_trade_sources()[0]
+
+
+def ingest_updates(states):
+    """Rows per trade type that the caches hold beyond `states` (see load_trade_sources), and the new states
+
+    Ingests the sources first, so it does not matter which process parsed the
+    appended rows. None when a cache was rebuilt since, the frame then has to be
+    loaded again.
+    """
+    updates, new_states = {}, {}
+    for trade_type, file_name in SOURCES.items():
+        csv_path = os.path.join(config.DATA_DIR, file_name)
+        ingest_trade_file(csv_path)
+        state = cache_state(csv_path)
+        known = states.get(trade_type)
+        if known is None or known['build'] != state['build']:
+            return None
+        held = set(known['parts'])
+        parts = [part for part in state['parts'] if part not in held]
+        if parts:
+            updates[trade_type] = _with_trade_type(read_partitions(csv_path, parts), trade_type)
+        new_states[trade_type] = state
+    return updates, new_states
+
+
+def _sources_key():
+    """Identity of the current source files, used to tell whether the shared file is stale"""
+    key = {'format': CACHE_FORMAT}
+    for file_name in SOURCES.values():
+        stat = os.stat(os.path.join(config.DATA_DIR, file_name))
+        key[file_name] = [stat.st_mtime_ns, stat.st_size]
+    return key
+
+
+def dataset_version():
+    """Short identifier of the current source files, used to key caches"""
+    text = json.dumps(_sources_key(), sort_keys=True)
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:12]
+
+
+def shared_dataset_path():
+    return os.path.join(config.DATA_CACHE_DIR, 'trade_data.arrow')
+
+
+def build_shared_dataset():
+    """Write the combined frame as a memory-mappable Arrow file, unless it is up to date"""
+    import pyarrow as pa
+
+    path = shared_dataset_path()
+    manifest_path = path + '.json'
+
+    def current():
+        manifest = _read_manifest(manifest_path)
+        return manifest is not None and manifest.get('sources') == _sources_key() and os.path.exists(path)
+
+    if current():
+        return path
+
+    # One process builds the file (e.g. every worker on a hot reload); the others wait and map it
+    os.makedirs(config.DATA_CACHE_DIR, exist_ok=True)
+    with open(path + '.lock', 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        if current():
+            return path
+
+        logger.info("Building shared dataset %s", path)
+        key = _sources_key()
+        frame = load_trade_data()
+
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        del frame
+
+        def write(tmp_path):
+            with pa.OSFile(tmp_path, 'wb') as sink:
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+
+        _write_atomic(path, write)
+        _write_manifest(manifest_path, {'sources': key, 'rows': table.num_rows})
+    return path
+
+
+def load_shared_dataset():
+    """Combined frame backed by the memory-mapped Arrow file (numeric columns are read-only views)"""
+    import pyarrow as pa
+
+    path = build_shared_dataset()
+    table = pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+    return table.to_pandas(split_blocks=True)
+
+
+def load_dataset():
+    """Combined trade frame for the configured data mode"""
+    if config.DATA_MODE == 'shared':
+        return load_shared_dataset()
+    return load_trade_data()
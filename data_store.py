@@ -0,0 +1,154 @@
+# Versioned trade data with background reloading
+#
+# The store holds the current TradeDataset. A watcher thread polls the source
+# CSVs; once a change has been stable for one poll interval, the new version is
+# loaded in the background and swapped in with a single reference assignment.
+# When the files only grew, just the cache part files the current version does
+# not hold yet are read and added to it, whichever worker parsed them, and the
+# cube is updated from their aggregates alone. Each request pins the version
+# that is current when it starts (DataStore.pin, run before every request), and
+# store.current() returns that version for the rest of the request, so requests
+# already in flight finish on the version they started with.
+import logging
+import threading
+import time
+
+import flask
+
+import config
+import data_loader
+from dataset import TradeDataset
+
+logger = logging.getLogger(__name__)
+
+
+class DataStore:
+    """Current TradeDataset plus the machinery to swap in new versions"""
+
+    def __init__(self):
+        self._dataset = self._load(data_loader.dataset_version())
+        self._pending_version = None
+        self._listeners = []
+        self._reload_lock = threading.Lock()
+
+    @staticmethod
+    def _load(version):
+        if config.DATA_MODE == 'shared':
+            return TradeDataset(data_loader.load_dataset(), version=version)
+        frame, sources = data_loader.load_trade_sources()
+        return TradeDataset(frame, version=version, sources=sources)
+
+    def _next_version(self, version):
+        """Extend the current dataset with the cached rows it lacks, or load it again if that is not possible"""
+        if config.DATA_MODE == 'shared' or self._dataset.sources is None:
+            # Workers must map the rebuilt shared file; without the cache state
+            # it was read from, what the dataset lacks cannot be worked out
+            return self._load(version)
+        result = data_loader.ingest_updates(self._dataset.sources)
+        if result is None:
+            return self._load(version)
+        updates, sources = result
+        return self._dataset.extended(updates, version, sources)
+
+    def pin(self):
+        """Pin the current version for the rest of this request (a before_request hook)"""
+        flask.g.mtid_dataset = self._dataset
+
+    def current(self):
+        """The dataset version to use for one request: the pinned one, else the newest"""
+        if flask.has_request_context():
+            dataset = flask.g.get('mtid_dataset')
+            if dataset is not None:
+                return dataset
+        return self._dataset
+
+    def on_swap(self, listener):
+        """Call listener(dataset) after every swap, e.g. to drop caches of the old version"""
+        self._listeners.append(listener)
+
+    def reload_if_changed(self, wait_for_stable=True):
+        """Load and swap in a new version if the source files changed; True if swapped"""
+        version = data_loader.dataset_version()
+        if version == self._dataset.version:
+            self._pending_version = None
+            return False
+
+        # Files being written right now show a new version on every poll
+        if wait_for_stable and version != self._pending_version:
+            self._pending_version = version
+            return False
+
+        with self._reload_lock:
+            if version == self._dataset.version:
+                return False
+            dataset = self._next_version(version)
+            self._dataset = dataset
+            self._pending_version = None
+
+        logger.info("Swapped in trade data version %s (%d rows)", version, len(dataset))
+        # The swap has happened; a failing listener must not keep the others from running
+        for listener in self._listeners:
+            try:
+                listener(dataset)
+            except Exception:
+                logger.exception("Swap listener %r failed for version %s", listener, version)
+        return True
+
+    def _watch(self, interval):
+        while True:
+            time.sleep(interval)
+            try:
+                self.reload_if_changed()
+            except Exception:
+                logger.exception("Reloading trade data failed, keeping version %s", self._dataset.version)
+
+    def frame(self):
+        """Stand-in for the current DataFrame, for code that keeps a reference to it"""
+        return CurrentFrame(self)
+
+    def watch(self, interval):
+        """Start the background watcher thread"""
+        thread = threading.Thread(
+            target=self._watch, args=(interval,), name='mtid-data-watcher', daemon=True
+        )
+        thread.start()
+        return thread
+
+
+class CurrentFrame:
+    """DataFrame-like view that resolves store.current().df on every access
+
+    Page modules register their callbacks once, with the frame they will filter
+    in every request. Handing them this instead of a DataFrame keeps those
+    callbacks on the version pinned for the request, so indexing and methods
+    such as df[df['Trade_Type'] == t] or df.groupby(...) all see the same rows.
+
+    It is not a DataFrame: isinstance checks fail and plotly express, pd.concat
+    and the like do not accept it. Pass them df.current(), the real DataFrame,
+    or a frame selected from df.
+    """
+
+    def __init__(self, store):
+        self._store = store
+
+    def current(self):
+        """The DataFrame of the version pinned for this request"""
+        return self._store.current().df
+
+    def __getattr__(self, name):
+        return getattr(self._store.current().df, name)
+
+    def __getitem__(self, key):
+        return self._store.current().df[key]
+
+    def __len__(self):
+        return len(self._store.current().df)
+
+    def __iter__(self):
+        return iter(self._store.current().df)
+
+    def __contains__(self, key):
+        return key in self._store.current().df
+
+    def __repr__(self):
+        return f"CurrentFrame({self._store.current().version!r})"
@@ -0,0 +1,80 @@
+# Combined trade data partitioned by trade type
+import threading
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import data_loader
+from alerts import AlertIndex
+from cube import TradeCube
+
+
+class TradeDataset:
+    """Combined formal/informal frame with one contiguous row block per trade type"""
+
+    def __init__(self, df, version=None, cube=None, sources=None):
+        # Rows are ordered by Trade_Type once, so every partition is a zero-copy
+        # slice and switching trade type never compares strings or copies rows
+        trade_types = list(data_loader.SOURCES)
+        if not isinstance(df['Trade_Type'].dtype, pd.CategoricalDtype):
+            df['Trade_Type'] = pd.Categorical(df['Trade_Type'], categories=trade_types)
+
+        codes = df['Trade_Type'].cat.codes.to_numpy()
+        if len(codes) and np.any(np.diff(codes) < 0):
+            order = np.argsort(codes, kind='stable')
+            df = df.take(order).reset_index(drop=True)
+            codes = codes[order]
+
+        self.df = df
+        self.version = version
+        # Cache state per trade type the rows were read from (data_loader.load_trade_sources)
+        self.sources = sources
+        self.loaded_at = datetime.now()
+        self.columns = [col for col in df.columns if col != 'Trade_Type']
+
+        # Partition boundaries, found by binary search on the sorted codes
+        self._partitions = {}
+        for code, trade_type in enumerate(df['Trade_Type'].cat.categories):
+            start, stop = np.searchsorted(codes, [code, code + 1])
+            self._partitions[trade_type] = df.iloc[start:stop]
+
+        # Aggregates for the KPI and chart callbacks
+        self.cube = TradeCube(df) if cube is None else cube
+
+        # Smart Alerts are scored on first use, once per version
+        self._alerts = None
+        self._alerts_lock = threading.Lock()
+
+    def extended(self, updates, version, sources):
+        """New version with rows appended per trade type and the cube updated incrementally"""
+        if not updates:
+            # The caches hold no rows beyond this version's (e.g. the files were only touched)
+            return TradeDataset(self.df, version=version, cube=self.cube, sources=sources)
+        frames = []
+        for trade_type, partition in self._partitions.items():
+            frames.append(partition)
+            if trade_type in updates:
+                frames.append(updates[trade_type])
+        new_rows = data_loader.concat_frames(list(updates.values()))
+        return TradeDataset(
+            data_loader.concat_frames(frames), version=version, cube=self.cube.extended(new_rows), sources=sources
+        )
+
+    @property
+    def alerts(self):
+        """AlertIndex of this version"""
+        if self._alerts is None:
+            with self._alerts_lock:
+                if self._alerts is None:
+                    self._alerts = AlertIndex(self.df)
+        return self._alerts
+
+    def partition(self, trade_type):
+        """Rows of one trade type (a view, do not modify)"""
+        if trade_type not in self._partitions:
+            return self.df.iloc[0:0]
+        return self._partitions[trade_type]
+
+    def __len__(self):
+        return len(self.df)
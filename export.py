@@ -0,0 +1,141 @@
+# Streaming export of the filtered and sorted raw dataset (CSV, Excel, Parquet)
+#
+# Rows are written in chunks straight from the trade-type partition, using the
+# same filter_query / sort_by handling as the Page 7 table, so neither the
+# filtered frame nor the whole file is ever held in memory. Excel and Parquet
+# are written chunk by chunk to a temporary file that is streamed and removed.
+import json
+import os
+import tempfile
+
+import flask
+
+import raw_table
+
+CHUNK_ROWS = 50_000
+
+# Rows per worksheet (Excel's limit is 1,048,576 including the header row)
+XLSX_SHEET_ROWS = 1_048_575
+
+FORMATS = {
+    'csv': 'text/csv',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+
+def iter_chunks(frame, positions, columns, chunk_rows=CHUNK_ROWS):
+    """Slices of the selected rows, chunk_rows at a time"""
+    for start in range(0, len(positions), chunk_rows):
+        yield frame.iloc[positions[start:start + chunk_rows]][columns]
+
+
+def iter_csv(frame, positions, columns):
+    """CSV text, one chunk of rows at a time"""
+    yield ','.join(columns) + '\n'
+    for chunk in iter_chunks(frame, positions, columns):
+        yield chunk.to_csv(index=False, header=False)
+
+
+def _stream_file(path, block_size=1 << 20):
+    """Yield a file's bytes and delete it afterwards"""
+    try:
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(block_size), b''):
+                yield block
+    finally:
+        os.remove(path)
+
+
+def write_parquet(path, frame, positions, columns):
+    """Parquet file with one row group per chunk"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    writer = None
+    try:
+        for chunk in iter_chunks(frame, positions, columns):
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema)
+            writer.write_table(table)
+        if writer is None:
+            pq.write_table(pa.Table.from_pandas(frame.iloc[0:0][columns], preserve_index=False), path)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def write_xlsx(path, frame, positions, columns):
+    """Excel workbook written row by row in constant-memory mode"""
+    import xlsxwriter
+
+    workbook = xlsxwriter.Workbook(path, {'constant_memory': True})
+    header_format = workbook.add_format({'bold': True})
+    sheet = None
+    row = 0
+    sheet_number = 0
+    try:
+        for chunk in iter_chunks(frame, positions, columns):
+            # Plain Python values, with missing cells left empty
+            records = chunk.astype(object).where(chunk.notna(), None).to_numpy().tolist()
+            for record in records:
+                if sheet is None or row > XLSX_SHEET_ROWS:
+                    sheet_number += 1
+                    sheet = workbook.add_worksheet(f"Data {sheet_number}")
+                    sheet.write_row(0, 0, columns, header_format)
+                    row = 1
+                sheet.write_row(row, 0, record)
+                row += 1
+        if sheet is None:
+            workbook.add_worksheet("Data 1").write_row(0, 0, columns, header_format)
+    finally:
+        workbook.close()
+
+
+def export_response(fmt, frame, positions, columns, file_name):
+    """Streaming Flask response for one export format"""
+    headers = {'Content-Disposition': f'attachment; filename="{file_name}.{fmt}"'}
+
+    if fmt == 'csv':
+        body = flask.stream_with_context(iter_csv(frame, positions, columns))
+        return flask.Response(body, mimetype=FORMATS[fmt], headers=headers)
+
+    fd, path = tempfile.mkstemp(suffix='.' + fmt)
+    os.close(fd)
+    try:
+        writer = write_xlsx if fmt == 'xlsx' else write_parquet
+        writer(path, frame, positions, columns)
+    except Exception:
+        os.remove(path)
+        raise
+    headers['Content-Length'] = str(os.path.getsize(path))
+    return flask.Response(_stream_file(path), mimetype=FORMATS[fmt], headers=headers)
+
+
+def register_routes(app, store):
+    """Add /export/raw-data.<fmt> to the Dash server"""
+
+    @app.server.route('/export/raw-data.<fmt>')
+    def export_raw_data(fmt):
+        if fmt not in FORMATS:
+            flask.abort(404)
+
+        args = flask.request.args
+        trade_type = args.get('trade_type', 'Formal')
+        filter_query = args.get('filter_query', '')
+        try:
+            sort_by = json.loads(args.get('sort_by') or '[]')
+        except ValueError:
+            flask.abort(400)
+        if not raw_table.valid_sort_by(sort_by):
+            flask.abort(400)
+
+        dataset = store.current()
+        frame = dataset.partition(trade_type)
+        positions = raw_table.query_positions(
+            (dataset.version, trade_type), frame, filter_query, sort_by
+        )
+        return export_response(
+            fmt, frame, positions, dataset.columns, f"mtid_{trade_type.lower()}_trade"
+        )
@@ -0,0 +1,26 @@
+# gunicorn settings: gunicorn -c gunicorn.conf.py
+import os
+
+import data_loader
+import repository
+# Not 'import config': gunicorn would read a module-level 'config' as its own setting
+from config import DATA_MODE, QUERY_BACKEND
+
+wsgi_app = 'app:server'
+bind = os.environ.get('MTID_BIND', '0.0.0.0:8050')
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+
+# Threaded workers: the master's timeout only watches each worker's main loop, so a
+# long request (an xlsx export of 1M rows takes minutes) is not killed half-way.
+# A sync worker would be killed after `timeout` seconds of any single request.
+worker_class = 'gthread'
+threads = int(os.environ.get('MTID_THREADS', 4))
+timeout = int(os.environ.get('MTID_WORKER_TIMEOUT', 120))
+
+
+def on_starting(server):
+    """Build the shared memory-mapped dataset and query database once in the master, before any worker forks"""
+    if DATA_MODE == 'shared':
+        data_loader.build_shared_dataset()
+    if QUERY_BACKEND == 'duckdb':
+        repository.build_database(data_loader.dataset_version())
@@ -0,0 +1,213 @@
+# Opt-in timing and profiling of Dash callbacks
+#
+# When MTID_METRICS is off, install() returns immediately and the callbacks run
+# unwrapped. When it is on, every registered server callback is wrapped to
+# record wall time, serialization time, response bytes and the rows it scanned.
+# Metrics are per worker and exposed in Prometheus text format at /metrics;
+# each call is also logged as one JSON line on the 'mtid.callbacks' logger.
+#
+# Adding ?profile=1 to the dashboard URL (or to a callback request) profiles
+# every callback of that browser session with cProfile, or with pyinstrument
+# for ?profile=pyinstrument, and writes the dumps to MTID_PROFILE_DIR.
+import cProfile
+import functools
+import json
+import logging
+import os
+import threading
+import time
+
+import flask
+from dash import _callback
+
+import config
+
+logger = logging.getLogger('mtid.callbacks')
+
+PROFILE_COOKIE = 'mtid_profile'
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+
+_local = threading.local()
+_lock = threading.Lock()
+_metrics = {}
+
+
+def record_rows(n_rows):
+    """Called from inside a callback to report how many rows it scanned"""
+    if hasattr(_local, 'rows'):
+        _local.rows += n_rows
+
+
+def _timed_to_json(to_json):
+    @functools.wraps(to_json)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return to_json(*args, **kwargs)
+        finally:
+            if hasattr(_local, 'serialize_seconds'):
+                _local.serialize_seconds += time.perf_counter() - start
+    return wrapper
+
+
+def _observe(name, seconds, serialize_seconds, payload_bytes, rows):
+    with _lock:
+        metric = _metrics.setdefault(name, {
+            'count': 0,
+            'seconds': 0.0,
+            'serialize_seconds': 0.0,
+            'payload_bytes': 0,
+            'rows': 0,
+            'buckets': [0] * len(LATENCY_BUCKETS),
+        })
+        metric['count'] += 1
+        metric['seconds'] += seconds
+        metric['serialize_seconds'] += serialize_seconds
+        metric['payload_bytes'] += payload_bytes
+        metric['rows'] += rows
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                metric['buckets'][i] += 1
+
+
+def _profile_mode():
+    """'cprofile', 'pyinstrument' or None for the current request"""
+    if not flask.has_request_context():
+        return None
+    value = flask.request.args.get('profile') or flask.request.cookies.get(PROFILE_COOKIE)
+    if not value or value == '0':
+        return None
+    return 'pyinstrument' if value == 'pyinstrument' else 'cprofile'
+
+
+def _run_profiled(mode, name, func, args, kwargs):
+    """Run one callback under a profiler and dump the result to the profile directory"""
+    os.makedirs(config.PROFILE_DIR, exist_ok=True)
+    stamp = f"{name}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{time.time_ns() % 1_000_000}"
+
+    if mode == 'pyinstrument':
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            logger.warning("pyinstrument is not installed, falling back to cProfile")
+        else:
+            profiler = Profiler()
+            profiler.start()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                profiler.stop()
+                with open(os.path.join(config.PROFILE_DIR, stamp + '.html'), 'w') as f:
+                    f.write(profiler.output_html())
+
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(func, *args, **kwargs)
+    finally:
+        profiler.dump_stats(os.path.join(config.PROFILE_DIR, stamp + '.prof'))
+
+
+def _wrap(name, func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        _local.rows = 0
+        _local.serialize_seconds = 0.0
+        mode = _profile_mode()
+        response = None
+        start = time.perf_counter()
+        try:
+            if mode:
+                response = _run_profiled(mode, name, func, args, kwargs)
+            else:
+                response = func(*args, **kwargs)
+            return response
+        finally:
+            seconds = time.perf_counter() - start
+            payload_bytes = len(response) if isinstance(response, (str, bytes)) else 0
+            serialize_seconds = _local.serialize_seconds
+            rows = _local.rows
+            del _local.rows, _local.serialize_seconds
+            _observe(name, seconds, serialize_seconds, payload_bytes, rows)
+            logger.info(json.dumps({
+                'callback': name,
+                'seconds': round(seconds, 6),
+                'serialize_seconds': round(serialize_seconds, 6),
+                'payload_bytes': payload_bytes,
+                'rows_scanned': rows,
+                'profiled': mode,
+                'pid': os.getpid(),
+            }))
+    return wrapper
+
+
+def _wrap_callback_map(callback_map):
+    for output, entry in callback_map.items():
+        func = entry.get('callback')
+        if func is None or getattr(func, '_mtid_instrumented', False):
+            continue
+        name = getattr(func, '__name__', None) or output
+        wrapped = _wrap(name, func)
+        wrapped._mtid_instrumented = True
+        entry['callback'] = wrapped
+
+
+def prometheus_text():
+    """Current metrics in the Prometheus text exposition format"""
+    lines = [
+        '# HELP mtid_callback_seconds Wall time of Dash callbacks.',
+        '# TYPE mtid_callback_seconds histogram',
+    ]
+    with _lock:
+        snapshot = {name: dict(metric, buckets=list(metric['buckets'])) for name, metric in _metrics.items()}
+
+    for name, metric in sorted(snapshot.items()):
+        for bound, count in zip(LATENCY_BUCKETS, metric['buckets']):
+            lines.append(f'mtid_callback_seconds_bucket{{callback="{name}",le="{bound}"}} {count}')
+        lines.append(f'mtid_callback_seconds_bucket{{callback="{name}",le="+Inf"}} {metric["count"]}')
+        lines.append(f'mtid_callback_seconds_sum{{callback="{name}"}} {metric["seconds"]}')
+        lines.append(f'mtid_callback_seconds_count{{callback="{name}"}} {metric["count"]}')
+
+    for metric_name, key, help_text in (
+        ('mtid_callback_serialize_seconds_total', 'serialize_seconds', 'Time spent serializing callback responses.'),
+        ('mtid_callback_payload_bytes_total', 'payload_bytes', 'Bytes of callback responses.'),
+        ('mtid_callback_rows_scanned_total', 'rows', 'Dataset rows scanned by callbacks.'),
+    ):
+        lines.append(f'# HELP {metric_name} {help_text}')
+        lines.append(f'# TYPE {metric_name} counter')
+        for name, metric in sorted(snapshot.items()):
+            lines.append(f'{metric_name}{{callback="{name}"}} {metric[key]}')
+
+    return '\n'.join(lines) + '\n'
+
+
+def install(app):
+    """Wrap every callback registered so far and add the /metrics endpoint (no-op when disabled)"""
+    if not config.METRICS_ENABLED:
+        return
+
+    _callback.to_json = _timed_to_json(_callback.to_json)
+    _wrap_callback_map(app.callback_map)
+    _wrap_callback_map(_callback.GLOBAL_CALLBACK_MAP)
+
+    server = app.server
+
+    @server.before_request
+    def _wrap_late_callbacks():
+        # Global @callback functions only move into app.callback_map on the first request
+        _wrap_callback_map(app.callback_map)
+
+    @server.after_request
+    def _remember_profile_flag(response):
+        value = flask.request.args.get('profile')
+        if value is not None and not flask.request.path.startswith('/_dash'):
+            if value in ('', '0'):
+                response.delete_cookie(PROFILE_COOKIE)
+            else:
+                response.set_cookie(PROFILE_COOKIE, value, httponly=True, samesite='Lax')
+        return response
+
+    @server.route('/metrics')
+    def metrics():
+        return flask.Response(prometheus_text(), mimetype='text/plain; version=0.0.4')
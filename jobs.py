@@ -0,0 +1,84 @@
+# Background jobs for slow page computations
+#
+# Heavy page layouts run as Dash background callbacks in a separate process, so
+# a slow page no longer holds a web worker for the whole computation. Results
+# and progress live in a diskcache directory that every gunicorn worker on the
+# box shares (no Redis or Celery). Results are cached per (callback, inputs,
+# dataset version), and a request for a job that is already running, from any
+# client or worker, attaches to that job instead of starting a second one.
+import logging
+
+from dash import DiskcacheManager
+
+import config
+
+logger = logging.getLogger(__name__)
+
+# Job id returned when the result is already cached and nothing was started
+NO_JOB = 0
+
+
+class SharedJobManager(DiskcacheManager):
+    """DiskcacheManager whose jobs are shared by every client asking for the same result"""
+
+    @staticmethod
+    def _make_job_key(key):
+        return key + '-job'
+
+    def call_job_fn(self, key, job_fn, args, context):
+        if self.result_ready(key):
+            return NO_JOB
+
+        job_key = self._make_job_key(key)
+        running = self.handle.get(job_key)
+        if running and self.job_running(running):
+            return running
+
+        job = super().call_job_fn(key, job_fn, args, context)
+        # add() only succeeds for the first of two identical requests racing here
+        if not self.handle.add(job_key, job, expire=config.JOB_TIMEOUT):
+            running = self.handle.get(job_key)
+            if running and running != job and self.job_running(running):
+                super().terminate_job(job)
+                return running
+            self.handle.set(job_key, job, expire=config.JOB_TIMEOUT)
+        return job
+
+    def job_running(self, job):
+        # Polls for an already cached result carry no job id
+        if not job or int(job) == NO_JOB:
+            return False
+        return super().job_running(job)
+
+    def terminate_job(self, job):
+        # Other clients may be waiting on the same job and its result is cached,
+        # so a client navigating away does not cancel it; finished jobs are reaped
+        if not job or int(job) == NO_JOB or self.job_running(job):
+            return
+        super().terminate_job(job)
+
+    def get_progress(self, key):
+        # Left in place so every client polling the job sees it
+        return self.handle.get(self._make_progress_key(key))
+
+    def get_result(self, key, job):
+        result = super().get_result(key, job)
+        if result is not self.UNDEFINED:
+            self.clear_cache_entry(self._make_job_key(key))
+        return result
+
+
+def create_manager(version):
+    """Shared job manager keyed on the dataset version, or None to run everything in the request"""
+    if not config.JOBS_ENABLED:
+        return None
+    try:
+        import diskcache
+        return SharedJobManager(
+            diskcache.Cache(config.JOBS_DIR),
+            cache_by=[version],
+            expire=config.JOB_RESULT_TTL,
+        )
+    except ImportError:
+        logger.warning('Background jobs need "dash[diskcache]", running slow pages in the request')
+        return None
@@ -0,0 +1,210 @@
+# Server-side paging, sorting and filtering for the Page 7 raw dataset viewer
+import re
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+import instrumentation
+
+# Columns the DataTable treats as numbers (everything else is filtered as text)
+NUMERIC_COLUMNS = ['Year', 'Trade_Value_USD', 'Quantity']
+
+# Number and total size of the filtered/sorted row orders kept per worker
+QUERY_CACHE_SIZE = 32
+QUERY_CACHE_BYTES = 256 * 1024 * 1024
+
+# One filter expression as produced by the DataTable, e.g. {Region} icontains "EAC"
+FILTER_PART = re.compile(
+    r'^\s*\{(?P<column>[^}]+)\}\s*'
+    r'(?P<operator>is blank|is not blank|[si]?(?:contains|datestartswith|eq|ne|lt|le|gt|ge)\b|[si]?(?:!=|<=|>=|=|<|>))'
+    r'\s*(?P<value>.*?)\s*$'
+)
+
+SYMBOLS = {'=': 'eq', '!=': 'ne', '<': 'lt', '<=': 'le', '>': 'gt', '>=': 'ge'}
+
+_query_cache = OrderedDict()
+_query_cache_bytes = 0
+_query_cache_lock = threading.Lock()
+
+
+def split_filter_part(filter_part):
+    """Split one DataTable filter expression into (column, operator, value, case_sensitive)"""
+    match = FILTER_PART.match(filter_part)
+    if not match:
+        return None, None, None, True
+
+    column = match.group('column')
+    operator = match.group('operator')
+    case_sensitive = True
+
+    if operator not in ('is blank', 'is not blank') and operator[0] in 'si':
+        case_sensitive = operator[0] == 's'
+        operator = operator[1:]
+    operator = SYMBOLS.get(operator, operator)
+
+    # Quoted values are always strings, bare values are numbers when they parse
+    # and the column is numeric (a bare 09 on HS2 stays '09')
+    value = match.group('value')
+    if value and value[0] == value[-1] and value[0] in ('"', "'", '`') and len(value) > 1:
+        value = value[1:-1].replace('\\' + value[0], value[0])
+    elif column in NUMERIC_COLUMNS:
+        try:
+            value = float(value)
+        except ValueError:
+            pass
+
+    return column, operator, value, case_sensitive
+
+
+def _text_mask(series, predicate):
+    """Evaluate a string predicate, once per category when the column is categorical"""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        categories = pd.Series(series.cat.categories.astype(str))
+        matching = np.flatnonzero(predicate(categories).to_numpy(dtype=bool))
+        return np.isin(series.cat.codes.to_numpy(), matching)
+    return predicate(series.astype(str)).to_numpy(dtype=bool)
+
+
+def _filter_mask(frame, column, operator, value, case_sensitive):
+    """Boolean mask for a single parsed filter expression"""
+    series = frame[column]
+
+    if operator == 'is blank':
+        return series.isna().to_numpy()
+    if operator == 'is not blank':
+        return series.notna().to_numpy()
+
+    if column in NUMERIC_COLUMNS and operator not in ('contains', 'datestartswith'):
+        if not isinstance(value, float):
+            return np.zeros(len(frame), dtype=bool)
+        compare = {
+            'eq': series.eq, 'ne': series.ne, 'lt': series.lt,
+            'le': series.le, 'gt': series.gt, 'ge': series.ge,
+        }[operator]
+        return compare(value).to_numpy()
+
+    # Text comparison, matching what the native DataTable filter does
+    text = str(int(value)) if isinstance(value, float) and value.is_integer() else str(value)
+    if not case_sensitive:
+        text = text.lower()
+
+    def prepare(values):
+        return values if case_sensitive else values.str.lower()
+
+    if operator == 'contains':
+        return _text_mask(series, lambda values: prepare(values).str.contains(text, regex=False))
+    if operator == 'datestartswith':
+        return _text_mask(series, lambda values: prepare(values).str.startswith(text))
+
+    compare = {
+        'eq': lambda values: prepare(values) == text,
+        'ne': lambda values: prepare(values) != text,
+        'lt': lambda values: prepare(values) < text,
+        'le': lambda values: prepare(values) <= text,
+        'gt': lambda values: prepare(values) > text,
+        'ge': lambda values: prepare(values) >= text,
+    }[operator]
+    return _text_mask(series, compare)
+
+
+def filter_positions(frame, filter_query):
+    """Row positions of `frame` that satisfy a DataTable filter_query"""
+    mask = np.ones(len(frame), dtype=bool)
+    for filter_part in (filter_query or '').split(' && '):
+        if not filter_part.strip():
+            continue
+        column, operator, value, case_sensitive = split_filter_part(filter_part)
+        if column not in frame.columns:
+            continue
+        mask &= _filter_mask(frame, column, operator, value, case_sensitive)
+    return np.flatnonzero(mask)
+
+
+def valid_sort_by(sort_by):
+    """Whether sort_by has the DataTable's shape: a list of {'column_id', 'direction'} dicts"""
+    return isinstance(sort_by, list) and all(
+        isinstance(s, dict) and isinstance(s.get('column_id'), str) and s.get('direction') in ('asc', 'desc')
+        for s in sort_by
+    )
+
+
+def sort_positions(frame, positions, sort_by):
+    """Reorder row positions according to the DataTable sort_by list"""
+    sort_by = [s for s in (sort_by or []) if s['column_id'] in frame.columns]
+    if not sort_by or len(positions) == 0:
+        return positions
+
+    subset = frame.iloc[positions][[s['column_id'] for s in sort_by]]
+    subset = subset.reset_index(drop=True)
+    order = subset.sort_values(
+        [s['column_id'] for s in sort_by],
+        ascending=[s['direction'] == 'asc' for s in sort_by],
+        kind='stable',
+        na_position='last'
+    ).index.to_numpy()
+    return positions[order]
+
+
+def query_positions(key, frame, filter_query, sort_by):
+    """Filtered and sorted row positions of the frame identified by `key`, cached for paging"""
+    global _query_cache_bytes
+
+    # Unfiltered and unsorted: the rows in frame order, nothing to compute or cache
+    if not (filter_query or '').strip() and not any(s['column_id'] in frame.columns for s in (sort_by or [])):
+        return range(len(frame))
+
+    cache_key = (
+        key,
+        filter_query or '',
+        tuple((s['column_id'], s['direction']) for s in (sort_by or []))
+    )
+    with _query_cache_lock:
+        if cache_key in _query_cache:
+            _query_cache.move_to_end(cache_key)
+            return _query_cache[cache_key]
+
+    instrumentation.record_rows(len(frame))
+    positions = filter_positions(frame, filter_query)
+    positions = sort_positions(frame, positions, sort_by)
+    if positions.nbytes > QUERY_CACHE_BYTES:
+        return positions
+
+    with _query_cache_lock:
+        if cache_key not in _query_cache:
+            _query_cache[cache_key] = positions
+            _query_cache_bytes += positions.nbytes
+        while len(_query_cache) > QUERY_CACHE_SIZE or _query_cache_bytes > QUERY_CACHE_BYTES:
+            _, evicted = _query_cache.popitem(last=False)
+            _query_cache_bytes -= evicted.nbytes
+    return positions
+
+
+def clear_cache():
+    """Forget all cached row orders, e.g. after new data is loaded"""
+    global _query_cache_bytes
+    with _query_cache_lock:
+        _query_cache.clear()
+        _query_cache_bytes = 0
+
+
+def query_page(key, frame, page_current, page_size, sort_by, filter_query):
+    """Return (page rows, number of matching rows) for the requested table page"""
+    positions = query_positions(key, frame, filter_query, sort_by)
+    start = (page_current or 0) * page_size
+    page = frame.iloc[positions[start:start + page_size]]
+    return page, len(positions)
+
+
+def page_tooltips(page, columns, min_length=0):
+    """Markdown tooltips for the given columns of one page, skipping short values"""
+    columns = [col for col in columns if col in page.columns]
+    values = {col: page[col].astype(str).tolist() for col in columns}
+    return [
+        {
+            col: {'value': values[col][i], 'type': 'markdown'}
+            for col in columns
+            if len(values[col][i]) >= min_length
+        } for i in range(len(page))
+    ]
@@ -0,0 +1,283 @@
+# Query API for page callbacks and the chat assistant
+#
+# Callbacks ask for aggregates (measures summed by dimensions, with filters)
+# instead of slicing the DataFrame themselves. Two interchangeable backends:
+#
+#   'pandas'  answers from the in-memory TradeDataset, through the cube when
+#             every dimension and filter is one of the cube's dimensions
+#   'duckdb'  answers from an embedded columnar database file built once per
+#             dataset version from the Parquet cache. Group-bys run in DuckDB's
+#             vectorized engine, and the rows stay in the file (read through the
+#             OS page cache) instead of in every worker's heap.
+#
+# Queries are parameterized; dimension and measure names are checked against
+# the schema before they are put into SQL.
+import fcntl
+import glob
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+import config
+import data_loader
+from csv_loader import SCHEMA
+from cube import DIMENSIONS
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ['Trade_Type'] + list(SCHEMA)
+
+# Measure name -> SQL aggregate
+MEASURES = {
+    'Trade_Value_USD': 'SUM("Trade_Value_USD")',
+    'Quantity': 'SUM("Quantity")',
+    'Records': 'COUNT(*)',
+}
+
+# Open repositories per dataset version, kept while requests may still use the previous one
+OPEN_VERSIONS = 2
+
+
+def _check(names, allowed, kind):
+    for name in names:
+        if name not in allowed:
+            raise KeyError(f"{name} is not a {kind}")
+
+
+def _as_list(value):
+    return list(value) if isinstance(value, (list, tuple, set)) else [value]
+
+
+class Repository:
+    """Aggregate queries over one dataset version; queries the cube can answer never reach the rows"""
+
+    def __init__(self, cube=None):
+        self.cube = cube
+
+    def _use_cube(self, columns):
+        return self.cube is not None and set(columns) <= set(DIMENSIONS)
+
+    def aggregate(self, dims=(), measures=None, trade_type=None, order_by=None, limit=None, **filters):
+        """Measures summed up to dims, e.g. aggregate(['Partner_Country'], trade_type='Formal', Year=2024)"""
+        dims = list(dims)
+        measures = list(measures or MEASURES)
+        _check(dims + list(filters), COLUMNS, 'column')
+        _check(measures, MEASURES, 'measure')
+        if order_by is not None:
+            _check([order_by], measures, 'selected measure')
+
+        if not self._use_cube(dims + list(filters)):
+            return self._aggregate(dims, measures, trade_type, order_by, limit, filters)
+
+        if trade_type is not None:
+            filters['Trade_Type'] = trade_type
+        result = self.cube.rollup(dims, measures, **filters)
+        if order_by is not None:
+            result = result.sort_values(order_by, ascending=False, kind='stable')
+        if limit is not None:
+            result = result.head(limit)
+        return result.reset_index(drop=True)
+
+    def total(self, measure='Trade_Value_USD', trade_type=None, **filters):
+        """Single total of one measure"""
+        return self.aggregate((), [measure], trade_type, **filters)[measure].iloc[0]
+
+    def values(self, dim, trade_type=None, **filters):
+        """Sorted distinct values of one column"""
+        _check([dim] + list(filters), COLUMNS, 'column')
+        if not self._use_cube([dim] + list(filters)):
+            return self._values(dim, trade_type, filters)
+        if trade_type is not None:
+            filters['Trade_Type'] = trade_type
+        return self.cube.values(dim, **filters)
+
+
+class PandasRepository(Repository):
+    """Queries answered from the in-memory dataset"""
+
+    def __init__(self, dataset):
+        super().__init__(dataset.cube)
+        self.dataset = dataset
+
+    def _rows(self, trade_type, filters):
+        frame = self.dataset.df if trade_type is None else self.dataset.partition(trade_type)
+        if not filters:
+            return frame
+        mask = np.ones(len(frame), dtype=bool)
+        for col, value in filters.items():
+            mask &= frame[col].isin(_as_list(value)).to_numpy()
+        return frame[mask]
+
+    def _aggregate(self, dims, measures, trade_type, order_by, limit, filters):
+        rows = self._rows(trade_type, filters)
+        named = {
+            measure: ('Trade_Value_USD', 'size') if measure == 'Records' else (measure, 'sum')
+            for measure in measures
+        }
+        if dims:
+            result = rows.groupby(dims, observed=True, sort=True, dropna=False).agg(**named).reset_index()
+        else:
+            result = pd.DataFrame({
+                measure: [len(rows) if measure == 'Records' else rows[measure].sum()]
+                for measure in measures
+            })
+        if order_by is not None:
+            result = result.sort_values(order_by, ascending=False, kind='stable')
+        if limit is not None:
+            result = result.head(limit)
+        return result.reset_index(drop=True)
+
+    def _values(self, dim, trade_type, filters):
+        rows = self._rows(trade_type, filters)
+        return sorted(pd.unique(rows[dim].dropna().to_numpy()).tolist())
+
+
+class DuckDBRepository(Repository):
+    """Queries answered by DuckDB from the database file of one dataset version"""
+
+    def __init__(self, path, cube=None):
+        super().__init__(cube)
+        self.path = path
+        self._pid = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._database = None
+
+    def _cursor(self):
+        """Connection of the calling thread; all threads of a worker share one database instance"""
+        import duckdb
+
+        with self._lock:
+            if self._database is None or self._pid != os.getpid():
+                # A forked process (gunicorn worker, background job) opens its own
+                self._database = duckdb.connect(self.path, read_only=True)
+                self._pid = os.getpid()
+                self._local = threading.local()
+        cursor = getattr(self._local, 'cursor', None)
+        if cursor is None:
+            cursor = self._local.cursor = self._database.cursor()
+        return cursor
+
+    def query(self, sql, params=()):
+        """Run a parameterized query and return a DataFrame"""
+        return self._cursor().execute(sql, list(params)).df()
+
+    @staticmethod
+    def _where(trade_type, filters):
+        clauses, params = [], []
+        if trade_type is not None:
+            filters = dict(filters, Trade_Type=trade_type)
+        for col, value in filters.items():
+            values = _as_list(value)
+            clauses.append(f'"{col}" IN ({", ".join("?" * len(values))})')
+            params.extend(values)
+        return (' WHERE ' + ' AND '.join(clauses) if clauses else ''), params
+
+    def _aggregate(self, dims, measures, trade_type, order_by, limit, filters):
+        select = [f'"{dim}"' for dim in dims] + [f'{MEASURES[m]} AS "{m}"' for m in measures]
+        where, params = self._where(trade_type, filters)
+        sql = f'SELECT {", ".join(select)} FROM trade{where}'
+        if dims:
+            group = ', '.join(f'"{dim}"' for dim in dims)
+            sql += f' GROUP BY {group}'
+            sql += f' ORDER BY "{order_by}" DESC' if order_by is not None else f' ORDER BY {group}'
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(int(limit))
+        return self.query(sql, params)
+
+    def _values(self, dim, trade_type, filters):
+        where, params = self._where(trade_type, filters)
+        result = self.query(
+            f'SELECT DISTINCT "{dim}" FROM trade{where}'
+            f'{" AND" if where else " WHERE"} "{dim}" IS NOT NULL ORDER BY 1',
+            params,
+        )
+        return result[dim].tolist()
+
+
+def database_path(version):
+    return os.path.join(config.DATA_CACHE_DIR, f'trade_data-{version}.duckdb')
+
+
+def build_database(version):
+    """Write the trade data of one version into a DuckDB file, unless it exists already"""
+    import duckdb
+
+    path = database_path(version)
+    os.makedirs(config.DATA_CACHE_DIR, exist_ok=True)
+    with open(os.path.join(config.DATA_CACHE_DIR, 'trade_data.duckdb.lock'), 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        if os.path.exists(path):
+            return path
+
+        logger.info("Building query database %s", path)
+        selects = []
+        for trade_type, file_name in data_loader.SOURCES.items():
+            files = data_loader.partition_files(os.path.join(config.DATA_DIR, file_name))
+            if files:
+                file_list = ', '.join(f"'{f}'" for f in files)
+                selects.append(
+                    f"SELECT '{trade_type}' AS Trade_Type, * "
+                    f"FROM read_parquet([{file_list}], union_by_name = true)"
+                )
+
+        # Sorted so the per-block min/max let DuckDB skip whole trade types and periods
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        con = duckdb.connect(tmp_path)
+        try:
+            con.execute(
+                f'CREATE TABLE trade AS SELECT * FROM ({" UNION ALL BY NAME ".join(selects)}) '
+                'ORDER BY Trade_Type, Year, Quarter'
+            )
+        finally:
+            con.close()
+        os.replace(tmp_path, path)
+
+        # Keep the previous version too: workers that have not swapped yet open
+        # it lazily on their next query. Older files can go, open handles survive.
+        paths = sorted(glob.glob(database_path('*')), key=os.path.getmtime, reverse=True)
+        for old_path in paths[OPEN_VERSIONS:]:
+            if old_path != path:
+                os.remove(old_path)
+        return path
+
+
+_repositories = OrderedDict()
+_repositories_lock = threading.Lock()
+_store = None
+
+
+def open_repository(dataset):
+    """Repository for one dataset version with the configured backend"""
+    if config.QUERY_BACKEND != 'duckdb' or dataset.version is None:
+        return PandasRepository(dataset)
+
+    with _repositories_lock:
+        repository = _repositories.get(dataset.version)
+        if repository is None:
+            try:
+                repository = DuckDBRepository(build_database(dataset.version), dataset.cube)
+            except ImportError:
+                logger.warning("duckdb is not installed, answering queries with pandas")
+                return PandasRepository(dataset)
+            _repositories[dataset.version] = repository
+            while len(_repositories) > OPEN_VERSIONS:
+                _repositories.popitem(last=False)
+        return repository
+
+
+def bind(store):
+    """Follow the store's versions; new versions are prepared on the watcher thread"""
+    global _store
+    _store = store
+    store.on_swap(open_repository)
+
+
+def current():
+    """Repository for the current dataset version, for page callbacks and the chat assistant"""
+    return open_repository(_store.current())
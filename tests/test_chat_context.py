@@ -0,0 +1,121 @@
+# Chat context: entity lookup, the character budget and facts per trade type
+from collections import OrderedDict
+
+import pytest
+
+import chat_context
+import config
+import data_loader
+import repository
+from benchmarks.synthetic import make_trade_frame
+from dataset import TradeDataset
+
+CATEGORY_COLUMNS = [
+    'Quarter', 'Month', 'Flow', 'HS2', 'HS4', 'HS_Code', 'HS_Description', 'Partner_Country', 'Region',
+    'Unit', 'Mode_of_Transport', 'Customs_Office',
+]
+
+
+def make_frame(n_rows, seed, trade_type):
+    frame = make_trade_frame(n_rows, seed=seed)
+    frame['Trade_Type'] = trade_type
+    return frame
+
+
+@pytest.fixture(scope='module')
+def dataset():
+    formal = make_frame(2_000, 0, 'Formal')
+    formal.loc[:99, ['Partner_Country', 'Region']] = ['Korea, Rep.', 'Asia']
+    formal.loc[100:199, 'Partner_Country'] = 'Congo (DRC)'
+    formal.loc[200:299, ['HS_Description', 'HS_Code']] = ['Other, of iron or steel', '732690']
+    informal = make_frame(500, 1, 'Informal')
+    informal.loc[:49, 'Partner_Country'] = 'South Sudan'
+
+    frames = []
+    for frame in (formal, informal):
+        for col in CATEGORY_COLUMNS:
+            frame[col] = frame[col].astype('category')
+        frames.append(frame)
+    return TradeDataset(data_loader.concat_frames(frames), version='test')
+
+
+@pytest.fixture(scope='module')
+def index(dataset):
+    return chat_context.SummaryIndex(repository.PandasRepository(dataset), ['Formal', 'Informal'])
+
+
+class StubStore:
+    """The part of DataStore the chat context uses"""
+
+    def __init__(self, dataset):
+        self.dataset = dataset
+        self.listeners = []
+
+    def current(self):
+        return self.dataset
+
+    def on_swap(self, listener):
+        self.listeners.append(listener)
+
+
+def stub_model(question, context):
+    """Stands in for the chat model: answers with the first fact about the first entity asked for"""
+    return context.split('\n')[0]
+
+
+def test_lookup_matches_names_with_punctuation(index):
+    assert index.lookup("Exports to Korea, Rep. and Congo (DRC)?") == [
+        ('Partner_Country', 'Korea, Rep.'),
+        ('Partner_Country', 'Congo (DRC)'),
+    ]
+    # Still whole names only
+    assert index.lookup("Trade with Kenyans") == []
+
+
+def test_lookup_finds_products_by_code_and_description_head(index):
+    assert index.lookup("How is 090111 doing?") == [('HS_Description', 'Coffee, not roasted, not decaffeinated')]
+    assert index.lookup("Coffee exports?") == [('HS_Description', 'Coffee, not roasted, not decaffeinated')]
+
+
+def test_stop_word_aliases_are_not_looked_up(index):
+    assert 'other' not in index.names
+    assert index.lookup("Which other partners matter?") == []
+    assert index.lookup("Imports of other, of iron or steel") == [
+        ('HS_Description', 'Other, of iron or steel')
+    ]
+
+
+def test_context_starts_with_the_entities_asked_for(index):
+    question = "How much do we export to Korea, Rep.?"
+    answer = stub_model(question, index.context(question, 'Formal'))
+    assert answer.startswith("Korea, Rep. (partner, Formal trade): exports $")
+
+
+def test_context_stays_within_the_budget(index):
+    question = "Compare Kenya, Uganda, China, India and Belgium"
+    full = index.context(question, 'Formal', max_chars=100_000)
+    short = index.context(question, 'Formal', max_chars=400)
+
+    assert len(short) <= 400
+    assert full.startswith(short)
+    assert len(index.context(question, 'Formal')) <= config.CHAT_CONTEXT_CHARS
+
+
+def test_facts_are_kept_per_trade_type(index):
+    question = "What about South Sudan?"
+    assert "South Sudan (partner, Informal trade)" in index.context(question, 'Informal')
+    formal = index.context(question, 'Formal')
+    assert "South Sudan" not in formal
+    assert formal.startswith("Formal trade ")
+    assert all(line.startswith("Informal") for line in index.overview['Informal'])
+
+
+def test_context_for_follows_the_store(dataset, monkeypatch):
+    store = StubStore(dataset)
+    monkeypatch.setattr(chat_context, '_store', None)
+    monkeypatch.setattr(chat_context, '_indexes', OrderedDict())
+    chat_context.bind(store)
+
+    assert store.listeners == [chat_context.summary_index]
+    question = "Exports to Congo (DRC)"
+    assert stub_model(question, chat_context.context_for(question, 'Formal')).startswith("Congo (DRC) (partner")
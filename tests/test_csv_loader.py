@@ -0,0 +1,87 @@
+# Chunked CSV loading: rejected rows, HS codes as text and the memory bound
+import os
+import tracemalloc
+
+import pandas as pd
+import pytest
+
+import config
+import csv_loader
+import data_loader
+from benchmarks.synthetic import make_trade_frame
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, 'DATA_CACHE_DIR', str(tmp_path / 'cache'))
+
+
+def write_csv(path, frame):
+    frame.to_csv(path, index=False)
+    return str(path)
+
+
+def load(csv_path, chunk_rows):
+    return data_loader.concat_frames(csv_loader.read_trade_chunks(csv_path, chunk_rows=chunk_rows))
+
+
+def test_bad_rows_are_rejected_with_a_reason(tmp_path):
+    frame = make_trade_frame(50, seed=1).astype({'Year': object, 'Quantity': object})
+    frame.loc[3, 'Flow'] = 'Re-export'
+    frame.loc[7, 'Year'] = 'n/a'
+    frame.loc[11, 'Trade_Value_USD'] = None
+    frame.loc[40, 'Quantity'] = -5
+    csv_path = write_csv(tmp_path / 'formal_trade.csv', frame)
+    with open(csv_path, 'a') as f:
+        f.write('2024,Q1,March,Export\n')
+        f.write(','.join(['2024'] * 16) + '\n')
+
+    rows = load(csv_path, chunk_rows=8)
+
+    assert len(rows) == 46
+    rejected = pd.read_csv(csv_loader.rejected_path(csv_path))
+    assert sorted(rejected['Reject_Reason'].dropna()) == sorted([
+        'Flow is not one of the allowed values',
+        'Year is not a number',
+        'Trade_Value_USD is missing',
+        'Quantity is negative',
+        'HS2 is missing',
+        'expected 15 fields, saw 16',
+    ])
+    assert rejected['Line'].dropna().tolist() == [53]
+
+
+def test_hs_codes_keep_leading_zeros(tmp_path):
+    frame = make_trade_frame(20, seed=2)
+    frame['HS2'], frame['HS4'], frame['HS_Code'] = '09', '0901', '090111'
+    frame.loc[0, ['HS2', 'HS4', 'HS_Code']] = ['9', '901', '90111']
+    frame.loc[1, ['HS2', 'HS4', 'HS_Code']] = ['9A', '09AB', 'ex0901']
+    csv_path = write_csv(tmp_path / 'formal_trade.csv', frame)
+
+    rows = load(csv_path, chunk_rows=5)
+
+    assert len(rows) == 20
+    assert isinstance(rows['HS2'].dtype, pd.CategoricalDtype)
+    assert rows.loc[0, ['HS2', 'HS4', 'HS_Code']].tolist() == ['09', '0901', '090111']
+    assert rows.loc[1, ['HS2', 'HS4', 'HS_Code']].tolist() == ['9A', '09AB', 'ex0901']
+    assert (rows['HS_Code'].iloc[2:] == '090111').all()
+    assert not os.path.exists(csv_loader.rejected_path(csv_path))
+
+
+def test_small_chunks_bound_peak_memory(tmp_path):
+    frame = make_trade_frame(40_000, seed=3)
+    csv_path = write_csv(tmp_path / 'formal_trade.csv', frame)
+
+    def peak(chunk_rows):
+        tracemalloc.start()
+        try:
+            rows = load(csv_path, chunk_rows)
+            return rows, tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    whole, whole_peak = peak(len(frame))
+    chunked, chunked_peak = peak(1_000)
+
+    pd.testing.assert_frame_equal(chunked, whole)
+    assert chunked_peak < whole_peak / 2
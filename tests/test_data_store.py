@@ -0,0 +1,67 @@
+# Hot reload: every worker picks up appended rows, whichever one ingested them
+import os
+
+import pytest
+
+import config
+import data_loader
+from benchmarks.synthetic import make_trade_frame, write_trade_csvs
+from data_store import DataStore
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, 'DATA_DIR', str(tmp_path))
+    monkeypatch.setattr(config, 'DATA_CACHE_DIR', str(tmp_path / '.cache'))
+    monkeypatch.setattr(config, 'DATA_MODE', 'cache')
+    write_trade_csvs(str(tmp_path), 1_000)
+    return tmp_path
+
+
+def append_rows(data_dir, file_name, n_rows, seed):
+    make_trade_frame(n_rows, seed=seed).to_csv(data_dir / file_name, mode='a', header=False, index=False)
+
+
+def test_every_store_sees_rows_ingested_by_another(data_dir):
+    first, second = DataStore(), DataStore()
+    append_rows(data_dir, 'formal_trade.csv', 100, seed=5)
+
+    assert first.reload_if_changed(wait_for_stable=False)
+    assert second.reload_if_changed(wait_for_stable=False)
+
+    fresh = DataStore().current()
+    for store in (first, second):
+        dataset = store.current()
+        assert dataset.version == fresh.version
+        assert len(dataset) == len(fresh) == 1_100
+        assert dataset.cube.total() == pytest.approx(fresh.cube.total())
+
+
+def test_rows_of_a_failed_reload_are_picked_up_next_time(data_dir, monkeypatch):
+    store = DataStore()
+    append_rows(data_dir, 'formal_trade.csv', 50, seed=6)
+    append_rows(data_dir, 'informal_trade.csv', 30, seed=7)
+
+    ingest = data_loader.ingest_trade_file
+
+    def failing(csv_path):
+        if os.path.basename(csv_path) == 'informal_trade.csv':
+            raise OSError('disk full')
+        return ingest(csv_path)
+
+    monkeypatch.setattr(data_loader, 'ingest_trade_file', failing)
+    with pytest.raises(OSError):
+        store.reload_if_changed(wait_for_stable=False)
+    assert len(store.current()) == 1_000
+
+    monkeypatch.setattr(data_loader, 'ingest_trade_file', ingest)
+    assert store.reload_if_changed(wait_for_stable=False)
+    assert len(store.current()) == 1_080
+
+
+def test_touched_files_keep_the_rows(data_dir):
+    store = DataStore()
+    os.utime(data_dir / 'formal_trade.csv', ns=(0, 0))
+
+    assert store.reload_if_changed(wait_for_stable=False)
+    assert len(store.current()) == 1_000
@@ -0,0 +1,127 @@
+# Compact transport of callback responses
+#
+# Three layers, all transparent to the browser:
+#
+#   - responses are serialized by plotly's JSON encoder (Dash's to_json) with
+#     orjson when it is installed, which also writes the numpy arrays of figure
+#     traces as base64 typed arrays ({'dtype': 'f8', 'bdata': ...}, plotly >= 6)
+#   - table pages travel in columnar form ({'columns', 'length', 'data'}), so
+#     column names are sent once instead of once per row; with
+#     MTID_TABLE_TYPED_ARRAYS numeric columns use the same typed-array encoding
+#     (cheaper to serialize, but random decimals compress better as text).
+#     RECORDS_JS turns the payload back into DataTable rows in the browser.
+#   - responses above MTID_COMPRESS_MIN_BYTES are brotli or gzip compressed
+#     (flask-compress), whichever the browser accepts
+import base64
+import logging
+
+import numpy as np
+import pandas as pd
+
+import config
+
+logger = logging.getLogger(__name__)
+
+# Typed-array dtypes understood by plotly.js and RECORDS_JS
+DTYPE_CODES = {
+    np.dtype('float64'): 'f8', np.dtype('float32'): 'f4',
+    np.dtype('int32'): 'i4', np.dtype('uint32'): 'u4',
+    np.dtype('int16'): 'i2', np.dtype('uint16'): 'u2',
+    np.dtype('int8'): 'i1', np.dtype('uint8'): 'u1',
+}
+
+INT32_RANGE = (np.iinfo(np.int32).min, np.iinfo(np.int32).max)
+
+# Browser side of columnar(): the DataTable rows, missing numbers as null
+RECORDS_JS = """
+function(page) {
+    if (!page) {
+        return window.dash_clientside.no_update;
+    }
+    const arrays = {
+        f8: Float64Array, f4: Float32Array, i4: Int32Array, u4: Uint32Array,
+        i2: Int16Array, u2: Uint16Array, i1: Int8Array, u1: Uint8Array
+    };
+    const values = page.columns.map(col => {
+        const column = page.data[col];
+        if (Array.isArray(column)) {
+            return column;
+        }
+        const bytes = Uint8Array.from(atob(column.bdata), c => c.charCodeAt(0));
+        return new arrays[column.dtype](bytes.buffer);
+    });
+    const rows = new Array(page.length);
+    for (let i = 0; i < page.length; i++) {
+        const row = {};
+        for (let j = 0; j < page.columns.length; j++) {
+            const value = values[j][i];
+            row[page.columns[j]] = (typeof value === 'number' && isNaN(value)) ? null : value;
+        }
+        rows[i] = row;
+    }
+    return rows;
+}
+"""
+
+
+def typed_array(values):
+    """Base64 typed-array spec of a numeric column, or None when it has to stay a list"""
+    if not pd.api.types.is_numeric_dtype(values.dtype) or pd.api.types.is_bool_dtype(values.dtype):
+        return None
+    array = values.to_numpy()
+    if array.dtype.kind in 'iu' and array.dtype not in DTYPE_CODES:
+        # JavaScript has no 64-bit integer arrays; int32 when the values fit, float64 otherwise
+        if len(array) == 0 or (INT32_RANGE[0] <= array.min() and array.max() <= INT32_RANGE[1]):
+            array = array.astype(np.int32)
+        else:
+            array = array.astype(np.float64)
+    elif array.dtype not in DTYPE_CODES:
+        # Nullable extension types and float16: missing values become NaN
+        array = values.to_numpy(dtype=np.float64, na_value=np.nan)
+    return {
+        'dtype': DTYPE_CODES[array.dtype],
+        'bdata': base64.b64encode(array.astype(array.dtype.newbyteorder('<'), copy=False).tobytes()).decode(),
+    }
+
+
+def columnar(frame, columns=None):
+    """Rows of frame as {'columns': [...], 'length': n, 'data': {column: values}}, for RECORDS_JS"""
+    columns = list(frame.columns if columns is None else columns)
+    data = {}
+    for col in columns:
+        values = frame[col]
+        encoded = typed_array(values) if config.TABLE_TYPED_ARRAYS else None
+        if encoded is None:
+            encoded = values.tolist()
+            if values.hasnans:
+                encoded = [None if pd.isna(value) else value for value in encoded]
+        data[col] = encoded
+    return {'columns': columns, 'length': len(frame), 'data': data}
+
+
+def install(app):
+    """Pick the JSON engine and compress large responses (no-op for what is not installed)"""
+    import plotly.io as pio
+
+    try:
+        import orjson  # noqa: F401
+        pio.json.config.default_engine = 'orjson'
+    except ImportError:
+        logger.warning('orjson is not installed, callback responses are serialized with json')
+
+    if not config.COMPRESS_ENABLED:
+        return
+    try:
+        from flask_compress import Compress
+    except ImportError:
+        logger.warning('Response compression needs "dash[compress]", sending responses uncompressed')
+        return
+
+    server = app.server
+    server.config.update(
+        COMPRESS_ALGORITHM=['br', 'gzip'],
+        COMPRESS_MIN_SIZE=config.COMPRESS_MIN_BYTES,
+        # Exports stream their own files (Parquet is compressed already)
+        COMPRESS_STREAMS=False,
+    )
+    Compress(server)